@@ -51,6 +51,18 @@ def _accept(prefix):
     return prefix[:4] == b"Gale"
 
 
+def is_supported(prefix):
+    """Return True if `prefix` is the header of a GAL variant this plugin can decode.
+
+    Args:
+        prefix: At least the first 8 bytes of the image data.
+
+    """
+    if prefix[:5] == b"GaleX":
+        return prefix[5:8] == b"200"
+    return _accept(prefix) and prefix[4:7].isdigit()
+
+
 class GalImageFile(ImageFile.ImageFile):
     """Image plugin for the LiveMaker GAL format."""
 
@@ -26,11 +26,16 @@ is unavailable).
 
 """
 
+import contextlib
 import enum
+import io
+import mmap
 import os.path
 import shutil
 import struct
+import sys
 import tempfile
+import threading
 import zlib
 from pathlib import Path, PureWindowsPath
 
@@ -324,6 +329,19 @@ DEFAULT_VERSION = 102
 # Max size of one split archive part (1GB)
 SPLIT_ARCHIVE_PART_SIZE = 1073741824
 
+# Chunk size for streaming entry data
+COPY_BUFSIZE = 1024 * 1024
+
+# file to file sendfile() is only supported on Linux
+_HAS_SENDFILE = sys.platform.startswith("linux") and hasattr(os, "sendfile")
+
+# EXE trailer: 32-bit archive offset followed by "lv" signature
+_TRAILER = struct.Struct("<I2s")
+# VF directory header: "vf" signature, version, count
+_DIRECTORY_HEADER = struct.Struct("<2sII")
+_OFFSET = struct.Struct("<II")
+_UINT32 = struct.Struct("<I")
+
 
 class LMObfuscator:
     """Class for (de)obfuscating LiveMaker directory fields.
@@ -555,6 +573,73 @@ class LMArchiveDirectory:
         return csum ^ 0xFFFFFFFF
 
 
+class _CountingWriter:
+    """Thin file object wrapper which tracks the current write position.
+
+    Used for archive output so that offsets can be computed without calling
+    ``tell()`` on the underlying file.
+
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        try:
+            self.pos = fp.tell()
+        except OSError:
+            self.pos = 0
+
+    def __getattr__(self, name):
+        return getattr(self.fp, name)
+
+    def write(self, data):
+        self.fp.write(data)
+        self.pos += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        self.pos = self.fp.seek(offset, whence)
+        return self.pos
+
+
+class _LMArchiveEntryFile(io.RawIOBase):
+    """Read-only raw stream over the (decompressed) data for an archive entry.
+
+    Returned (wrapped in ``io.BufferedReader``) by `LMArchive.open()`.
+
+    """
+
+    def __init__(self, chunks, decompressor=None):
+        self._chunks = chunks
+        self._decompressor = decompressor
+        self._buf = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buf:
+            chunk = next(self._chunks, None)
+            try:
+                if chunk is None:
+                    if self._decompressor is None:
+                        return 0
+                    data = self._decompressor.flush()
+                    if not self._decompressor.eof:
+                        raise UnsupportedLiveMakerCompression("Incomplete or truncated zlib stream")
+                    self._decompressor = None
+                elif self._decompressor is not None:
+                    data = self._decompressor.decompress(chunk)
+                else:
+                    data = chunk
+            except zlib.error as e:
+                raise UnsupportedLiveMakerCompression(str(e))
+            self._buf = memoryview(data)
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
 class LMArchive:
     """Provide interface to a LiveMaker archive (or exe).
 
@@ -602,6 +687,8 @@ class LMArchive:
             raise ValueError("mode must be 'r' or 'w'")
         self.mode = mode
         self._mode = modes[mode]
+        if mode == "w" and version < MIN_ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported LiveMaker archive version: {version}")
 
         if not fp:
             fp = open(name, self._mode)
@@ -620,9 +707,19 @@ class LMArchive:
 
         self.filelist = []
         self.name_info = {}
-
+        # output directories which are known to exist, see _extract()
+        self._extract_dirs = set()
+        # serializes seek + read on the underlying file(s), see _iter_raw()
+        self._read_lock = threading.Lock()
+        # read-only memory maps of the underlying file(s), see _map_read_fps()
+        self._read_maps = []
+        self._read_views = []
+
+        # start position of a caller supplied fp, restored if parsing fails
+        savepos = None
         try:
             if mode == "w":
+                self.fp = _CountingWriter(fp)
                 self._read_fps = []
                 if exe:
                     self.exefp = open(exe, "rb")
@@ -647,6 +744,13 @@ class LMArchive:
                     self.exefp = None
                 self.tmpfp = tempfile.TemporaryFile()
                 self.version = version
+                # directory fields are packed as entries are written
+                self._name_obfuscator = LMObfuscator()
+                self._dir_filenames = bytearray()
+                self._dir_compress_types = bytearray()
+                self._dir_unk1s = bytearray()
+                self._dir_checksums = bytearray()
+                self._dir_encrypt_flags = bytearray()
             else:
                 self.exefp = None
                 self.is_exe = False
@@ -679,9 +783,11 @@ class LMArchive:
                 else:
                     self.is_split = False
                     self.has_ext = False
+                self._map_read_fps()
         except Exception as e:
             if self._extfp:
-                self.fp.seek(savepos)
+                if savepos is not None:
+                    self.fp.seek(savepos)
             else:
                 if self._read_fps:
                     for fp in self._read_fps:
@@ -721,6 +827,17 @@ class LMArchive:
                 self.exefp.close()
             if self.tmpfp:
                 self.tmpfp.close()
+            for view in self._read_views:
+                view.release()
+            for mm in self._read_maps:
+                try:
+                    mm.close()
+                except BufferError:
+                    # an entry opened via open() is still referencing the
+                    # map, it will be unmapped once that is released
+                    pass
+            self._read_views = []
+            self._read_maps = []
             if self._read_fps:
                 for fp in self._read_fps:
                     if fp != self.fp:
@@ -729,6 +846,26 @@ class LMArchive:
                 self.fp.close()
             self.closed = True
 
+    def _map_read_fps(self):
+        """Memory map the archive file(s) for reading if possible.
+
+        Entry data is then sliced directly out of the maps, without a seek
+        and read per chunk. If any file cannot be mapped (i.e. `fp` is not a
+        regular file, or is empty), entries will be read via the file objects
+        instead.
+
+        """
+        maps = []
+        try:
+            for fp in self._read_fps or [self.fp]:
+                maps.append(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError, OverflowError):
+            for mm in maps:
+                mm.close()
+            return
+        self._read_maps = maps
+        self._read_views = [memoryview(mm) for mm in maps]
+
     def namelist(self):
         """Return a list of archive entries by name."""
         return sorted(self.name_info.keys())
@@ -751,12 +888,14 @@ class LMArchive:
 
     def list(self):
         """Print a list of archive entries to stdout."""
-        print(self.name)
-        print("-------- ------ -------- -------- ------- ------")
-        print(" Length   Mode    unk1    Chksum   Flags   Name")
-        print("-------- ------ -------- -------- ------- ------")
+        lines = [
+            self.name,
+            "-------- ------ -------- -------- ------- ------",
+            " Length   Mode    unk1    Chksum   Flags   Name",
+            "-------- ------ -------- -------- ------- ------",
+        ]
         for info in self.infolist():
-            print(
+            lines.append(
                 "{:8} {:6} {:08x} {:08x} {:02x} {}".format(
                     info.compressed_size,
                     info.compress_type.name,
@@ -766,6 +905,10 @@ class LMArchive:
                     info.name,
                 )
             )
+        # write the listing in one go rather than one (possibly flushed) line at a time
+        lines.append("")
+        sys.stdout.write("\n".join(lines))
+        sys.stdout.flush()
 
     def _find_archive_offset(self):
         """Find offset for the start of the archive."""
@@ -820,10 +963,30 @@ class LMArchive:
         if not isinstance(entry, LMArchiveInfo):
             entry = self.getinfo(entry)
         path = Path.joinpath(output_path, entry.path).expanduser().resolve()
-        path.parent.mkdir(parents=True, exist_ok=True)
-        data = self.read(entry)
-        with path.open("wb") as f:
-            f.write(data)
+        if path.parent not in self._extract_dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._extract_dirs.add(path.parent)
+            self._extract_dirs.update(path.parent.parents)
+        if entry.compress_type == LMCompressType.NONE and self._read_maps and _HAS_SENDFILE:
+            # uncompressed entries can be copied by the kernel directly
+            src = None
+        else:
+            # open the entry first so unsupported compression fails before the output is created
+            src = self.open(entry)
+        with contextlib.ExitStack() as stack:
+            if src is not None:
+                stack.enter_context(src)
+            f = stack.enter_context(path.open("wb"))
+            try:
+                if src is None:
+                    self._send_raw(entry, f)
+                else:
+                    shutil.copyfileobj(src, f, COPY_BUFSIZE)
+            except BaseException:
+                # don't leave a partial file behind for truncated or corrupt entries
+                f.close()
+                path.unlink()
+                raise
 
     def extract(self, name, path=None):
         """Extract the specified entry from the archive to the current working directory.
@@ -901,23 +1064,7 @@ class LMArchive:
             info = self.getinfo(name)
         if decompress and info.compress_type not in SUPPORTED_COMPRESSIONS:
             raise UnsupportedLiveMakerCompression(f"{info.compress_type} is unsupported")
-        if self._read_fps:
-            # archive data is split on 1GB (1024 * 1024 * 1024 bytes) boundaries
-            # start reading from whichever data file contains the start of
-            # this node, and then continue reading across boundary as needed
-            offset = self.archive_offset + info._offset
-            data = b""
-            while len(data) < info.compressed_size:
-                bytes_needed = info.compressed_size - len(data)
-                fp = self._read_fps[offset // SPLIT_ARCHIVE_PART_SIZE]
-                fp.seek(offset % SPLIT_ARCHIVE_PART_SIZE)
-                tmp = fp.read(bytes_needed)
-                data += tmp
-                offset += len(tmp)
-        else:
-            fp = self.fp
-            fp.seek(self.archive_offset + info._offset)
-            data = self.fp.read(info.compressed_size)
+        data = b"".join(self._iter_raw(info))
         if not skip_checksum and info.checksum is not None:
             if info.checksum != LMArchiveDirectory.checksum(data):
                 logger.warning(f"Bad checksum for file {info.name}.")
@@ -932,6 +1079,100 @@ class LMArchive:
                     raise UnsupportedLiveMakerCompression(str(e))
         return data
 
+    def open(self, name):
+        """Return a read-only file-like object for the specified file in the archive.
+
+        Unlike `read()`, entry data is read (and decompressed) incrementally, so the full
+        entry does not need to be held in memory. Encrypted entries cannot be streamed and
+        will be read in full.
+
+        Args:
+            name: Either the name of a file in the archive or a `LMArchiveInfo` object.
+
+        Raises:
+            UnsupportedLiveMakerCompression: If the specified entry uses an unsupported
+                compression method.
+
+        """
+        if self.closed:
+            raise ValueError("Archive is already closed.")
+        if self.mode != "r":
+            raise ValueError("Cannot read entry in archive which is open for writing.")
+        if isinstance(name, LMArchiveInfo):
+            info = name
+        else:
+            info = self.getinfo(name)
+        if info.compress_type not in SUPPORTED_COMPRESSIONS:
+            raise UnsupportedLiveMakerCompression(f"{info.compress_type} is unsupported")
+        if info.compress_type in (LMCompressType.ENCRYPTED, LMCompressType.ENCRYPTED_ZLIB):
+            return io.BytesIO(self.read(info))
+        if info.compress_type == LMCompressType.ZLIB:
+            decompressor = zlib.decompressobj()
+        else:
+            decompressor = None
+        return io.BufferedReader(_LMArchiveEntryFile(self._iter_raw(info), decompressor), COPY_BUFSIZE)
+
+    def _iter_raw(self, info):
+        """Yield the raw (compressed) data for the specified entry in chunks.
+
+        Chunks are memoryview slices of the mapped archive file where possible.
+        Otherwise each seek + read is done under the archive's read lock, so
+        entries can be read from multiple threads at once either way.
+
+        """
+        offset = self.archive_offset + info._offset
+        remaining = info.compressed_size
+        while remaining > 0:
+            size = min(remaining, COPY_BUFSIZE)
+            if self._read_fps:
+                # archive data is split on 1GB (1024 * 1024 * 1024 bytes)
+                # boundaries, don't read across split archive part boundaries
+                part = offset // SPLIT_ARCHIVE_PART_SIZE
+                part_offset = offset % SPLIT_ARCHIVE_PART_SIZE
+                size = min(size, SPLIT_ARCHIVE_PART_SIZE - part_offset)
+            else:
+                part = 0
+                part_offset = offset
+            if self._read_views:
+                data = self._read_views[part][part_offset : part_offset + size]
+            else:
+                fp = self._read_fps[part] if self._read_fps else self.fp
+                with self._read_lock:
+                    fp.seek(part_offset)
+                    data = fp.read(size)
+            if not data:
+                raise BadLiveMakerArchive(f"Unexpected end of archive data for {info.name}.")
+            yield data
+            offset += len(data)
+            remaining -= len(data)
+
+    def _send_raw(self, info, fileobj):
+        """Copy the raw data for the specified entry into `fileobj` using os.sendfile().
+
+        Data is copied between the file descriptors in the kernel, without passing
+        through user space. Only valid when the archive file(s) are regular files.
+
+        """
+        fileobj.flush()
+        out_fd = fileobj.fileno()
+        offset = self.archive_offset + info._offset
+        remaining = info.compressed_size
+        while remaining > 0:
+            if self._read_fps:
+                # don't read across split archive part boundaries
+                part_offset = offset % SPLIT_ARCHIVE_PART_SIZE
+                size = min(remaining, SPLIT_ARCHIVE_PART_SIZE - part_offset)
+                fp = self._read_fps[offset // SPLIT_ARCHIVE_PART_SIZE]
+            else:
+                part_offset = offset
+                size = remaining
+                fp = self.fp
+            sent = os.sendfile(out_fd, fp.fileno(), part_offset, size)
+            if not sent:
+                raise BadLiveMakerArchive(f"Unexpected end of archive data for {info.name}.")
+            offset += sent
+            remaining -= sent
+
     def read_exe(self):
         """Return the exe bytes for this archive.
 
@@ -949,6 +1190,38 @@ class LMArchive:
         self.fp.seek(0)
         return self.fp.read(self.archive_offset)
 
+    def read_exe_into(self, fileobj):
+        """Copy the exe bytes for this archive into `fileobj`.
+
+        Unlike :meth:`read_exe`, the exe is copied in chunks and is never
+        held in memory in its entirety.
+
+        Raises:
+            ValueError: If this archive is not part of a LiveMaker executable
+                (i.e. it is a ``.dat`` file).
+
+        """
+        if self.closed:
+            raise ValueError("Archive is already closed.")
+        if self.mode != "r":
+            raise ValueError("Cannot read exe from archive which is open for writing.")
+        if not self.is_exe:
+            raise ValueError("Archive is not part of a LiveMaker excecutable.")
+        if self._read_views and not self._read_fps:
+            # the exe itself is mapped, write straight out of the map
+            view = self._read_views[0]
+            for offset in range(0, self.archive_offset, COPY_BUFSIZE):
+                fileobj.write(view[offset : min(offset + COPY_BUFSIZE, self.archive_offset)])
+            return
+        self.fp.seek(0)
+        remaining = self.archive_offset
+        while remaining > 0:
+            data = self.fp.read(min(remaining, COPY_BUFSIZE))
+            if not data:
+                raise BadLiveMakerArchive("Unexpected EOF while reading exe")
+            fileobj.write(data)
+            remaining -= len(data)
+
     def write(self, filename, arcname=None, compress_type=None, unk1=None):
         """Write the file named `filename` into the archive.
 
@@ -1001,11 +1274,10 @@ class LMArchive:
         info.checksum = LMArchiveDirectory.checksum(data)
         info._offset = self.tmpfp.tell()
         self.tmpfp.write(data)
-        self.filelist.append(info)
-        self.name_info[name] = info
+        self._add_entry(info)
         return info.compressed_size
 
-    def writebytes(self, arcname, data, compress_type=None, skip_checksum=True):
+    def writebytes(self, arcname, data, compress_type=None, skip_checksum=True, compressed_size=None):
         """Write a raw (already compressed) file into the archive.
 
         This method can be used to copy compressed data from an
@@ -1026,12 +1298,17 @@ class LMArchive:
                 the info object.
             skip_checksum: If ``True`` and `arcname` is a `LMArchiveInfo` object, checksum
                 for `data` will not be calculated, and will be copied from `arcname`.
+            compressed_size: If given, the (compressed) size of `data` in bytes. When
+                `compressed_size` is given and the checksum is copied from `arcname`, `data`
+                may also be an iterable of bytes chunks, which will be streamed into the
+                archive without being joined into a single bytes object.
 
         Returns:
             The number of bytes written.
 
         Raises:
             FileExistsError: If an entry matching `arcname` already exists in this archive.
+            ValueError: If `compressed_size` does not match the number of bytes in `data`.
 
         """
         if self.closed:
@@ -1052,68 +1329,105 @@ class LMArchive:
             info.compress_type = compress_type
         if info.name in self.name_info:
             raise FileExistsError(f"{arcname} already exists in this archive.")
-        info.compressed_size = len(data)
-        if info.checksum is None:
-            info.checksum = LMArchiveDirectory.checksum(data)
         info._offset = self.tmpfp.tell()
-        self.tmpfp.write(data)
+        if compressed_size is not None:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                data = (data,)
+            elif info.checksum is None:
+                data = (b"".join(data),)
+            if info.checksum is None:
+                info.checksum = LMArchiveDirectory.checksum(data[0])
+            written = 0
+            for chunk in data:
+                written += self.tmpfp.write(chunk)
+            if written != compressed_size:
+                self.tmpfp.seek(info._offset)
+                self.tmpfp.truncate()
+                raise ValueError(f"Expected {compressed_size} bytes for {info.name}, got {written}.")
+            info.compressed_size = compressed_size
+        else:
+            info.compressed_size = len(data)
+            if info.checksum is None:
+                info.checksum = LMArchiveDirectory.checksum(data)
+            self.tmpfp.write(data)
+        self._add_entry(info)
+        return info.compressed_size
+
+    def _add_entry(self, info):
+        """Add a newly written entry to the archive index and directory fields."""
+        name = self._name_obfuscator.transform_bytes(info.name.encode("cp932"))
+        self._dir_filenames += _UINT32.pack(len(name))
+        self._dir_filenames += name
+        self._dir_compress_types.append(info.compress_type)
+        self._dir_unk1s += _UINT32.pack(info.unk1)
+        self._dir_checksums += _UINT32.pack(info.checksum)
+        self._dir_encrypt_flags.append(info.encrypt_flag)
         self.filelist.append(info)
         self.name_info[info.name] = info
-        return info.compressed_size
 
     def _write_exe(self):
         if self.is_exe and self.exefp:
-            self.fp.write(self.exefp.read())
+            self.exefp.seek(0)
+            sent = 0
+            try:
+                in_fd = self.exefp.fileno()
+                out_fd = self.fp.fileno()
+                size = os.fstat(in_fd).st_size
+                self.fp.flush()
+                start = self.fp.pos
+                # copy the exe in-kernel where possible
+                while sent < size:
+                    count = os.sendfile(out_fd, in_fd, sent, size - sent)
+                    if not count:
+                        break
+                    sent += count
+                self.fp.seek(start + sent)
+            except (AttributeError, OSError):
+                # sendfile unavailable on this platform or fp is not a regular file
+                if sent:
+                    raise
+                shutil.copyfileobj(self.exefp, self.fp)
 
     def _write_directory(self):
-        directory = {
-            "version": self.version,
-            "count": len(self.filelist),
-            "filenames": [],
-            "offsets": [],
-            "compress_types": [],
-            "unk1s": [],
-            "checksums": [],
-            "encrypt_flags": [],
-        }
-        self.archive_offset = archive_offset = self.fp.tell()
-        directory_size = LMArchiveDirectory.directory_size(self.version, self.name_info.keys())
-        filenames = directory["filenames"]
-        offsets = directory["offsets"]
-        compress_types = directory["compress_types"]
-        unk1s = directory["unk1s"]
-        checksums = directory["checksums"]
-        encrypt_flags = directory["encrypt_flags"]
-        for info in self.filelist:
-            filenames.append(info.name)
-            # info offset will be the offset of this entry in the temporary
-            # file (i.e. starting at 0). archive offsets need to start from the
-            # end of the directory.
-            offset = info._offset
-            if not self.is_split or not self.has_ext:
-                offset = info._offset + directory_size
-            offsets.append(LMArchiveDirectory.split_offset(offset))
-            compress_types.append(info.compress_type)
-            unk1s.append(info.unk1)
-            checksums.append(info.checksum)
-            encrypt_flags.append(info.encrypt_flag)
-        last_entry = self.filelist[-1]
-        if last_entry is not None:
-            offset = last_entry._offset + last_entry.compressed_size
-            if not self.is_split or not self.has_ext:
-                offset += directory_size
-            offsets.append(LMArchiveDirectory.split_offset(offset))
+        self.archive_offset = self.fp.pos
+        count = len(self.filelist)
+        # header, filenames, offsets, then 1 + 4 + 4 + 1 bytes of per-entry fields
+        directory_size = _DIRECTORY_HEADER.size + len(self._dir_filenames) + _OFFSET.size * (count + 1) + 10 * count
+        # info offset will be the offset of this entry in the temporary
+        # file (i.e. starting at 0). archive offsets need to start from the
+        # end of the directory.
+        offsets = [info._offset for info in self.filelist]
+        if self.filelist:
+            last_entry = self.filelist[-1]
+            offsets.append(last_entry._offset + last_entry.compressed_size)
         else:
             # handle empty archive
-            offsets.append(LMArchiveDirectory.split_offset(archive_offset))
-        data = LMArchiveDirectory.struct().build(directory)
-        self.fp.write(data)
+            offsets.append(0)
+        if not self.is_split or not self.has_ext:
+            offsets = [offset + directory_size for offset in offsets]
+        low_keys = LMObfuscator._keystream()
+        high_keys = LMObfuscator._keystream()
+        dir_offsets = bytearray()
+        for offset in offsets:
+            offset_low = (offset & 0xFFFFFFFF) ^ next(low_keys)
+            offset_high = (offset >> 32) << 31
+            if self.version >= 101:
+                # see LMObfuscator.transform_int_high()
+                offset_high = 0xFFFFFFFF if (offset_high ^ next(high_keys)) & 0x80000000 else 0
+            dir_offsets += _OFFSET.pack(offset_low, offset_high)
+        self.fp.write(_DIRECTORY_HEADER.pack(b"vf", self.version, count))
+        self.fp.write(self._dir_filenames)
+        self.fp.write(dir_offsets)
+        self.fp.write(self._dir_compress_types)
+        self.fp.write(self._dir_unk1s)
+        self.fp.write(self._dir_checksums)
+        self.fp.write(self._dir_encrypt_flags)
 
     def _write_archive(self):
         # copy data from temp file into final archive
         if self.is_split:
             self.tmpfp.seek(0, 2)
-            data_offset = self.fp.tell()
+            data_offset = self.fp.pos
             if data_offset > SPLIT_ARCHIVE_PART_SIZE:
                 raise BadLiveMakerArchive("Cannot generate split archive with exe+directory size > 1GB")
             if self.has_ext:
@@ -1143,9 +1457,7 @@ class LMArchive:
 
     def _write_trailer(self):
         if not self.is_split:
-            data = struct.pack("<I", self.archive_offset)
-            self.fp.write(data)
-            self.fp.write(b"lv")
+            self.fp.write(_TRAILER.pack(self.archive_offset, b"lv"))
 
 
 class LMArchiveInfo:
@@ -18,13 +18,16 @@
 # -*- coding: utf-8 -*-
 """pylivemaker cli."""
 
+import contextlib
+import os
+import shutil
 import sys
+import tempfile
 from pathlib import Path
 
 import click
-from PIL import Image
 
-from livemaker import GalImagePlugin, __version__  # noqa: F401
+from livemaker import __version__
 
 _version = """%(prog)s, version %(version)s
 
@@ -44,6 +47,83 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+# construct writes compiled files field by field, buffer them into larger writes
+WRITE_BUFSIZE = 1024 * 1024
+
+
+@contextlib.contextmanager
+def _output_file(path, force=False):
+    """Open an output file for writing.
+
+    Unless `force` is set the file is created exclusively, so an existing file
+    is never overwritten (without a separate check for whether it exists).
+    If an error occurs while writing, the new file is removed.
+
+    """
+    try:
+        f = open(path, "wb" if force else "xb")
+    except FileExistsError:
+        sys.exit(f"{path} already exists")
+    try:
+        with f:
+            yield f
+    except BaseException:
+        if not force:
+            Path(path).unlink()
+        raise
+
+
+def write_lines(lines):
+    """Write lines (plus a trailing newline) to stdout with a single write.
+
+    Used to emit a block of command output at once rather than one print() per line.
+
+    """
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+
+
+def backup_file(path, kind="LSB", data=None):
+    """Back up path to <path>.bak.
+
+    The backup is hardlinked to the original file where possible, replace_file()
+    replaces (rather than overwrites) the original so the backup is unaffected.
+    Otherwise the backup is written from `data` (the original file contents) if
+    it was already read, or copied from the original.
+
+    """
+    print(f"Backing up original {kind}.")
+    bak = f"{path}.bak"
+    try:
+        if os.path.lexists(bak):
+            os.unlink(bak)
+        os.link(path, bak)
+    except OSError:
+        # hardlinks unsupported (or cross-device)
+        if data is None:
+            shutil.copyfile(str(path), bak)
+        else:
+            with open(bak, "wb") as f:
+                f.write(data)
+
+
+def replace_file(path, write):
+    """Replace path with the data written to a file object by write(f).
+
+    The new data is written to a temp file which then replaces the original,
+    so that an interrupted write never leaves a truncated file behind.
+
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".pylivemaker-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb", buffering=WRITE_BUFSIZE) as f:
+            write(f)
+        shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
 
 @click.command()
 @click.version_option(version=__version__, message=_version)
@@ -58,15 +138,38 @@ def galconvert(force, input_file, output_file):
     Output format will be determined based on file extension.
 
     """
+    from PIL import Image
+
+    from livemaker import GalImagePlugin
+
+    if Path(input_file).suffix.lower() == ".gal":
+        # skip probing every other registered image format
+        formats = [GalImagePlugin.GalImageFile.format]
+    else:
+        formats = None
     try:
-        im = Image.open(input_file)
+        im = Image.open(input_file, formats=formats)
     except OSError as e:
         sys.exit(f"Error opening {input_file}: {e}")
-    if Path(output_file).exists() and not force:
-        sys.exit(f"{output_file} already exists")
-    print(f"Converting {input_file} to {output_file}")
-    im.load()
-    im.save(output_file)
+    out_format = Image.registered_extensions().get(Path(output_file).suffix.lower())
+    if not out_format:
+        sys.exit(f"Unknown output format for {output_file}")
+    copy = im.format == out_format and im.format != GalImagePlugin.GalImageFile.format
+    if copy:
+        # nothing to convert, copy the file rather than decoding and re-encoding it
+        im.close()
+        if force and Path(output_file).exists() and Path(output_file).samefile(input_file):
+            return
+    elif force:
+        # decode before the output (which may be the input) is truncated
+        im.load()
+    with _output_file(output_file, force) as f:
+        print(f"Converting {input_file} to {output_file}")
+        if copy:
+            with open(input_file, "rb") as src:
+                shutil.copyfileobj(src, f)
+        else:
+            im.save(f, format=out_format)
 
 
 @click.command()
@@ -79,6 +182,10 @@ def lmbmp(force, input_file):
     If the input file contains an alpha layer, a mask bitmap will be generated.
     Output files will be named <input_name>.bmp and <input_name>-m.bmp.
     """
+    from PIL import Image
+
+    from livemaker import GalImagePlugin  # noqa: F401
+
     input_file = Path(input_file)
     try:
         im = Image.open(input_file)
@@ -86,19 +193,21 @@ def lmbmp(force, input_file):
         sys.exit(f"Error opening {input_file}: {e}")
     name = Path(input_file.stem)
     output_file = input_file.parent / f"{name}.bmp"
-    if Path(output_file).exists() and not force:
-        sys.exit(f"{output_file} already exists")
-
-    try:
-        mask = im.getchannel("A")
-        output_mask = input_file.parent / f"{name}-m.bmp"
-        if Path(output_mask).exists() and not force:
-            sys.exit(f"{output_mask} already exists")
-        print(f"Generating mask {output_mask}")
-        mask.save(output_mask)
-    except ValueError:
-        pass
-
-    print(f"Converting {input_file} to {output_file}")
-    im = im.convert("RGB")
-    im.save(output_file)
+    output_mask = input_file.parent / f"{name}-m.bmp"
+    if force:
+        # decode before the output (which may be the input) is truncated
+        im.load()
+
+    with _output_file(output_file, force) as f:
+        try:
+            mask = im.getchannel("A")
+        except ValueError:
+            mask = None
+        if mask is not None:
+            with _output_file(output_mask, force) as mask_f:
+                print(f"Generating mask {output_mask}")
+                mask.save(mask_f, format="BMP")
+
+        print(f"Converting {input_file} to {output_file}")
+        im = im.convert("RGB")
+        im.save(f, format="BMP")
@@ -18,17 +18,19 @@
 # -*- coding: utf-8 -*-
 """LiveMaker archive CLI tool."""
 
+import functools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from io import BytesIO
 from pathlib import Path
 
 import click
-from PIL import Image
 
-from livemaker import GalImagePlugin  # noqa: F401
 from livemaker.archive import LMArchive
 from livemaker.exceptions import BadLiveMakerArchive, LiveMakerException
 
-from .cli import __version__, _version
+from .cli import __version__, _version, write_lines
 
 
 @click.group()
@@ -38,25 +40,121 @@ def lmar():
     pass
 
 
-def _extract_as_png(lm, info, output_dir, image_format, dry_run, verbose):
+# number of lines of output from lmar x to write at once
+OUTPUT_BATCH_SIZE = 256
+
+
+# favor conversion speed over file size by default
+PNG_COMPRESS_LEVEL = 1
+
+
+def _save_png(data, path, compress_level=PNG_COMPRESS_LEVEL):
+    """Decode GAL image data and save it as a PNG.
+
+    Runs in a worker process when images are converted in parallel.
+
+    """
+    # only load Pillow (and register the GAL plugin) when images are actually converted
+    from PIL import Image
+
+    from livemaker import GalImagePlugin
+
+    with BytesIO(data) as bio, Image.open(bio, formats=[GalImagePlugin.GalImageFile.format]) as im:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        im.save(path, format="PNG", compress_level=compress_level)
+
+
+def _write_entry(data, entry_path, output_dir):
+    """Write already read entry data to its path under `output_dir`."""
+    path = (output_dir / entry_path).expanduser().resolve()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def _extract_as_png(
+    lm,
+    info,
+    data,
+    entry_path,
+    output_dir,
+    image_format,
+    dry_run,
+    verbose,
+    converter=None,
+    compress_level=PNG_COMPRESS_LEVEL,
+):
+    """Convert a GAL entry to PNG and return the lines of output.
+
+    `data` is the entry data if it has already been read. Otherwise only the
+    header is read until the entry is known to be a supported GAL variant.
+    If `converter` is given, the image is decoded and saved in that executor.
+
+    """
+    from livemaker import GalImagePlugin
+
+    lines = []
     try:
-        png_path = info.path.parent.joinpath(f"{info.path.stem}.png")
+        png_path = entry_path.with_suffix(".png")
         if not dry_run:
-            data = lm.read(info)
-            path = output_dir.joinpath(png_path).expanduser().resolve()
-            im = Image.open(BytesIO(data))
-            path.parent.mkdir(parents=True, exist_ok=True)
-            im.save(path)
+            # check the header first so that unsupported variants go straight to the fallback
+            if data is None:
+                with lm.open(info) as f:
+                    header = f.read(8)
+            else:
+                header = data[:8]
+            if not GalImagePlugin.is_supported(header):
+                raise GalImagePlugin.GalImageError(f"Unsupported GAL variant {header!r}")
+            if data is None:
+                data = lm.read(info)
+            path = (output_dir / png_path).expanduser().resolve()
+            if converter:
+                converter.submit(_save_png, data, path, compress_level).result()
+            else:
+                _save_png(data, path, compress_level)
         if verbose or dry_run:
-            print(png_path)
+            lines.append(str(png_path))
     except LiveMakerException as e:
-        print(f"Error converting {info.path} to PNG: {e}")
+        lines.append(f"Error converting {entry_path} to PNG: {e}")
         if image_format == "png":
-            print("  Original GAL image will be used as fallback.")
+            lines.append("  Original GAL image will be used as fallback.")
+            if not dry_run:
+                if data is None:
+                    lm.extract(info, output_dir)
+                else:
+                    _write_entry(data, entry_path, output_dir)
+            if verbose or dry_run:
+                lines.append(str(entry_path))
+    return lines
+
+
+def _extract_entry(lm, output_dir, image_format, dry_run, verbose, converter, compress_level, info):
+    """Extract a single archive entry and return the lines of output."""
+    lines = []
+    # LMArchiveInfo.path builds a new PureWindowsPath on every access
+    entry_path = info.path
+    try:
+        if entry_path.suffix.lower() == ".gal" and image_format != "gal":
+            data = None
+            if image_format == "both":
+                if not dry_run:
+                    # read (and decompress) the entry once for both the GAL and PNG output
+                    data = lm.read(info)
+                    _write_entry(data, entry_path, output_dir)
+                if verbose or dry_run:
+                    lines.append(str(entry_path))
+            lines.extend(
+                _extract_as_png(
+                    lm, info, data, entry_path, output_dir, image_format, dry_run, verbose, converter, compress_level
+                )
+            )
+        else:
             if not dry_run:
                 lm.extract(info, output_dir)
             if verbose or dry_run:
-                print(info.path)
+                lines.append(str(entry_path))
+    except LiveMakerException as e:
+        lines.append(f"  Error extracting {entry_path}: {e}")
+    return lines
 
 
 @lmar.command()
@@ -72,36 +170,79 @@ def _extract_as_png(lm, info, output_dir, image_format, dry_run, verbose):
     " converted before extraction. If set to both, both the original GAL and converted PNG images will"
     " be extracted",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    help="Number of entries to extract (and images to convert) in parallel, defaults to the number of CPUs.",
+)
 @click.option("-o", "--output-dir", nargs=1, help="Output directory, defaults to current working directory.")
+@click.option(
+    "--png-compress-level",
+    type=click.IntRange(0, 9),
+    default=PNG_COMPRESS_LEVEL,
+    help="zlib compression level (0-9) for converted PNG images, defaults to 1. Use 9 for the smallest"
+    " (but slowest to write) files.",
+)
 @click.option("-v", "--verbose", is_flag=True, default=False)
 @click.argument("input_file", metavar="file", required=True, type=click.Path(exists=True, dir_okay=False))
-def x(dry_run, image_format, output_dir, verbose, input_file):
-    """Extract the specified archive."""
+def x(dry_run, image_format, jobs, output_dir, png_compress_level, verbose, input_file):
+    """Extract the specified archive.
+
+    Entries are extracted by a pool of worker threads. Entry data is read
+    from a memory map of the archive where possible (otherwise file reads
+    are serialized), so reads, decompression and writes can overlap. When
+    converting images to PNG, images are decoded in a pool of worker processes.
+
+    """
     if output_dir:
         output_dir = Path(output_dir)
     else:
         output_dir = Path.cwd()
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    converter = None
+    if image_format in ("png", "both") and jobs > 1 and not dry_run:
+        # GAL decoding is pure python and holds the GIL, use processes for it
+        converter = ProcessPoolExecutor(max_workers=jobs)
+        # start the worker processes now, from the main thread, rather than on the
+        # first submit() from an extraction thread (forking with other threads
+        # running can deadlock the child)
+        converter.submit(int).result()
     try:
         with LMArchive(input_file) as lm:
-            for info in lm.infolist():
-                try:
-                    if info.path.suffix.lower() == ".gal":
-                        if image_format in ("gal", "both"):
-                            if not dry_run:
-                                lm.extract(info, output_dir)
-                            if verbose or dry_run:
-                                print(info.path)
-                        if image_format in ("png", "both"):
-                            _extract_as_png(lm, info, output_dir, image_format, dry_run, verbose)
-                    else:
-                        if not dry_run:
-                            lm.extract(info, output_dir)
-                        if verbose or dry_run:
-                            print(info.path)
-                except LiveMakerException as e:
-                    print(f"  Error extracting {info.path}: {e}")
+            extract = functools.partial(
+                _extract_entry, lm, output_dir, image_format, dry_run, verbose, converter, png_compress_level
+            )
+            # only error messages are output unless listing every entry,
+            # so batch up listings but report errors as they happen
+            batch_size = OUTPUT_BATCH_SIZE if verbose or dry_run else 1
+            batch = []
+            try:
+                with ThreadPoolExecutor(max_workers=jobs) as executor:
+                    futures = [executor.submit(extract, info) for info in lm.infolist()]
+                    try:
+                        for future in futures:
+                            batch.extend(future.result())
+                            if len(batch) >= batch_size:
+                                write_lines(batch)
+                                batch = []
+                    except BaseException:
+                        # stop at the first unexpected error instead of waiting for
+                        # every remaining entry to be extracted on shutdown
+                        for future in futures:
+                            future.cancel()
+                        raise
+            finally:
+                # don't lose listings for already extracted entries if an entry fails
+                if batch:
+                    write_lines(batch)
+                sys.stdout.flush()
     except BadLiveMakerArchive as e:
         print(f"Could not read LiveMaker archive {input_file}: {e}")
+    finally:
+        if converter:
+            converter.shutdown()
 
 
 @lmar.command()
@@ -127,11 +268,13 @@ def strip(input_file, output_file):
     try:
         with LMArchive(input_file) as lm:
             if lm.is_exe:
-                path = Path(output_file)
-                if path.exists():
-                    print(f"{path} already exists and will be overwritten.")
-                with open(output_file, "wb") as f:
-                    f.write(lm.read_exe())
+                try:
+                    f = open(output_file, "xb")
+                except FileExistsError:
+                    print(f"{output_file} already exists and will be overwritten.")
+                    f = open(output_file, "wb")
+                with f:
+                    lm.read_exe_into(f)
             else:
                 print("The specified file is not a LiveMaker executable.")
     except BadLiveMakerArchive as e:
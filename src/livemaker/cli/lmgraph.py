@@ -18,8 +18,10 @@
 # -*- coding: utf-8 -*-
 """pylivemaker lsb call graph tool."""
 
+import os
 import sys
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import click
@@ -28,7 +30,6 @@ import pydot
 from livemaker.exceptions import LiveMakerException
 from livemaker.lsb import LMScript
 from livemaker.lsb.command import CommandType
-from livemaker.lsb.graph import make_graph, nx_to_dot
 
 from .cli import __version__, _version
 
@@ -45,89 +46,172 @@ IGNORED_SCRIPTS = [
 ]
 
 
-visited = set()
-lsbs_to_visit = deque()
-graph = pydot.Dot(graph_type="digraph")
+_END_COMMANDS = frozenset((CommandType.Exit, CommandType.Terminate, CommandType.PCReset))
 
 
-def parse_lsb(lsb_file, root_dir=None):
-    """Parse one LSB into the graph."""
-    if root_dir:
-        path = root_dir.joinpath(lsb_file)
-    else:
-        path = lsb_file
-    if path in visited:
-        return
-    visited.add(path)
-    print(f"processing {path}...")
+def _walk_lsb(lsb_file, path):
+    """Parse one LSB and return the scripts it references.
+
+    Returns a list of ``(page, condition)`` tuples, one for each Jump/Call to another
+    script, in the order they were reached. Runs in a worker process when scripts
+    are parsed in parallel.
+
+    """
     with open(path, "rb") as f:
-        try:
-            lsb = LMScript.from_file(f)
-        except LiveMakerException as e:
-            sys.exit(f"Could not open LSB file: {e}")
-    graph.add_node(pydot.Node(str(lsb_file), label=str(lsb_file)))
-    remaining_cmds = set(range(1, len(lsb.commands)))
+        lsb = LMScript.from_file(f)
+
+    commands = lsb.commands
+    refs = []
+    add_ref = refs.append
+
+    # one flag per command instead of a set of every remaining PC
+    visited_pc = bytearray(len(commands))
+    visited_pc[0] = 1
 
     # very naive attempt at determining condition for jumping to a new script
     cmds_to_visit = deque([(0, None)])
+
+    def visit(next_pc, calc):
+        # labels given by name or outside of the script are not followed
+        if isinstance(next_pc, int) and 0 <= next_pc < len(visited_pc) and not visited_pc[next_pc]:
+            visited_pc[next_pc] = 1
+            cmds_to_visit.append((next_pc, calc))
+
+    jump, call = CommandType.Jump, CommandType.Call
     while cmds_to_visit:
         pc, last_calc = cmds_to_visit.popleft()
-        cmd = lsb.commands[pc]
-        if cmd.type == CommandType.Jump:
-            ref = cmd.get("Page")
-            calc = str(cmd.get("Calc"))
+        cmd = commands[pc]
+        cmd_type = cmd.type
+        if cmd_type == jump:
+            # read args directly rather than through the command's mapping interface
+            ref = cmd.args["Page"]
+            page = ref.Page
+            calc = str(cmd.args["Calc"])
 
-            if ref.Page == lsb_file:
+            if page == lsb_file:
                 if calc != "1":
                     # branch not taken
-                    next_pc = pc + 1
-                    if next_pc in remaining_cmds:
-                        remaining_cmds.remove(next_pc)
-                        cmds_to_visit.append((next_pc, last_calc))
+                    visit(pc + 1, last_calc)
                 if calc != "0":
                     # branch taken
                     if calc == "1":
                         calc = last_calc
-                    next_pc = ref.Label
-                    if next_pc in remaining_cmds:
-                        remaining_cmds.remove(next_pc)
-                        cmds_to_visit.append((next_pc, calc))
-            elif not ref.Page.startswith("ノベルシステム"):
-                if last_calc:
-                    edge = pydot.Edge(lsb_file, ref.Page, label=last_calc)
-                else:
-                    edge = pydot.Edge(lsb_file, ref.Page)
-                graph.add_edge(edge)
-                lsbs_to_visit.append(ref.Page)
-        elif cmd.type == CommandType.Call:
-            ref = cmd.get("Page")
-            calc = str(cmd.get("Calc"))
-
-            if ref.Page != lsb_file and not ref.Page.startswith("ノベルシステム") and ref.Page not in IGNORED_SCRIPTS:
+                    visit(ref.Label, calc)
+            elif not page.startswith("ノベルシステム"):
+                add_ref((page, last_calc))
+        elif cmd_type == call:
+            # the call condition is not used, don't stringify it
+            page = cmd.args["Page"].Page
+
+            if page != lsb_file and not page.startswith("ノベルシステム") and page not in IGNORED_SCRIPTS:
                 # ignore calls to self (used for cleanup sometimes) and
                 # novel system calls
-                if last_calc:
-                    edge = pydot.Edge(lsb_file, ref.Page, label=last_calc)
-                else:
-                    edge = pydot.Edge(lsb_file, ref.Page)
-                graph.add_edge(edge)
-                lsbs_to_visit.append(ref.Page)
-
-            next_pc = pc + 1
-            if next_pc in remaining_cmds:
-                remaining_cmds.remove(next_pc)
-                cmds_to_visit.append((next_pc, last_calc))
-        elif cmd.type not in (CommandType.Exit, CommandType.Terminate, CommandType.PCReset):
-            next_pc = pc + 1
-            if next_pc in remaining_cmds:
-                remaining_cmds.remove(next_pc)
-                cmds_to_visit.append((next_pc, last_calc))
+                add_ref((page, last_calc))
+
+            visit(pc + 1, last_calc)
+        elif cmd_type not in _END_COMMANDS:
+            visit(pc + 1, last_calc)
+    return refs
+
+
+class GraphBuilder:
+    """Call graph builder for the scripts in a LiveNovel game.
+
+    Scripts are tracked by their (project relative) page name.
+
+    Args:
+        root_dir: Directory which script page names are relative to.
+
+    """
+
+    def __init__(self, root_dir=None):
+        self.root_dir = root_dir
+        self.visited = set()
+        self.pending = set()
+        self.queue = deque()
+        self.edges = set()
+        self.graph = pydot.Dot(graph_type="digraph")
+
+    def add(self, lsb_file):
+        """Queue an LSB to be parsed if it has not already been seen."""
+        if lsb_file in self.visited or lsb_file in self.pending:
+            return
+        self.pending.add(lsb_file)
+        self.queue.append(lsb_file)
+
+    def add_edge(self, src, dst, label=None):
+        """Add an edge to the graph unless an identical edge already exists."""
+        key = (src, dst, label)
+        if key in self.edges:
+            return
+        self.edges.add(key)
+        if label:
+            self.graph.add_edge(pydot.Edge(src, dst, label=label))
+        else:
+            self.graph.add_edge(pydot.Edge(src, dst))
+
+    def run(self, jobs=1):
+        """Parse queued LSBs (and any scripts they reference) into the graph.
+
+        If `jobs` is greater than 1, scripts are parsed in a pool of worker processes,
+        one breadth-first wave of queued scripts at a time. Results are merged in
+        queue order, so the graph is the same as when parsing serially.
+
+        """
+        if jobs <= 1:
+            while self.queue:
+                self.parse_lsb(self.queue.popleft())
+            return self.graph
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            while self.queue:
+                wave = []
+                while self.queue:
+                    lsb_file = self._start(self.queue.popleft())
+                    if lsb_file:
+                        wave.append(lsb_file)
+                paths = [self._path(lsb_file) for lsb_file in wave]
+                for lsb_file, refs in zip(wave, executor.map(_walk_lsb, wave, paths)):
+                    self._finish(lsb_file, refs)
+        return self.graph
+
+    def parse_lsb(self, lsb_file):
+        """Parse one LSB into the graph."""
+        lsb_file = self._start(lsb_file)
+        if lsb_file:
+            self._finish(lsb_file, _walk_lsb(lsb_file, self._path(lsb_file)))
+
+    def _path(self, lsb_file):
+        if self.root_dir:
+            return self.root_dir.joinpath(lsb_file)
+        return lsb_file
+
+    def _start(self, lsb_file):
+        # mark a queued LSB as visited, returns None if it was already parsed
+        lsb_file = str(lsb_file)
+        self.pending.discard(lsb_file)
+        if lsb_file in self.visited:
+            return None
+        self.visited.add(lsb_file)
+        print(f"processing {self._path(lsb_file)}...")
+        return lsb_file
+
+    def _finish(self, lsb_file, refs):
+        self.graph.add_node(pydot.Node(lsb_file, label=lsb_file))
+        for page, calc in refs:
+            self.add_edge(lsb_file, page, calc)
+            self.add(page)
 
 
 @lmgraph.command()
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    help="Number of scripts to parse in parallel, defaults to the number of CPUs.",
+)
 @click.argument("lsb_file", required=True, type=click.Path(exists=True, dir_okay=False))
 @click.argument("out_file", required=False)
-def game(lsb_file, out_file):
+def game(jobs, lsb_file, out_file):
     """Generate a DOT syntax call graph for a full LiveNovel game.
 
     lsb_file should be a path to the root script node - this should always be ゲームメイン.lsb (game_main.lsb)
@@ -141,10 +225,12 @@ def game(lsb_file, out_file):
     print(f"Generating graph for {path}")
     if path.name != "ゲームメイン.lsb":
         print("Warning: input filename is not ゲームメイン.lsb")
-    root_dir = path.parent
-    lsbs_to_visit.append(path.name)
-    while lsbs_to_visit:
-        parse_lsb(lsbs_to_visit.popleft(), root_dir=root_dir)
+    builder = GraphBuilder(root_dir=path.parent)
+    builder.add(path.name)
+    try:
+        graph = builder.run(jobs or os.cpu_count() or 1)
+    except LiveMakerException as e:
+        sys.exit(f"Could not open LSB file: {e}")
     if not out_file:
         out_file = f"{lsb_file}.dot"
     with open(out_file, "w") as f:
@@ -164,6 +250,9 @@ def lsb(lsb_file, out_file):
     The output graph will contain blocks of LSB commands as nodes
     and branch points as edges.
     """
+    # networkx is slow to import, only load it when it is actually used
+    from livemaker.lsb.graph import make_graph, nx_to_dot
+
     path = Path(lsb_file)
     print(f"Generating execution graph for {path}")
 
@@ -18,8 +18,8 @@
 # -*- coding: utf-8 -*-
 """LiveMaker LPB project settings CLI tool."""
 
-import shutil
 import sys
+from pathlib import Path
 
 import click
 
@@ -27,7 +27,7 @@ from livemaker.exceptions import BadLpbError, LiveMakerException
 from livemaker.lpb import LMProject
 from livemaker.lsb.core import Param, ParamType
 
-from .cli import __version__, _version
+from .cli import __version__, _version, backup_file, replace_file, write_lines
 from .lmlsb import _edit_parser_op
 
 
@@ -43,27 +43,30 @@ def lmlpb():
 def probe(input_file):
     """Output information about the specified LPB file in human-readable form."""
     print(input_file)
-    with open(input_file, "rb") as f:
-        try:
-            lpb = LMProject.from_file(f)
-        except BadLpbError as e:
-            sys.exit(f"Could not read file: {e}")
-    print("LiveMaker project settings file:")
-    print(f"  Version: {lpb.version} (LiveMaker{lpb.lm_version})")
-    print(f"  Project Name: {lpb.project_name}")
-    print(f"  Project dir: {lpb.project_dir}")
-    print(f"  Init LSB: {lpb.init_lsb}")
-    print(f"  Exit LSB: {lpb.exit_lsb}")
-    print("  Settings:")
+    try:
+        lpb = LMProject.from_lpb(Path(input_file).read_bytes())
+    except BadLpbError as e:
+        sys.exit(f"Could not read file: {e}")
+    lines = [
+        "LiveMaker project settings file:",
+        f"  Version: {lpb.version} (LiveMaker{lpb.lm_version})",
+        f"  Project Name: {lpb.project_name}",
+        f"  Project dir: {lpb.project_dir}",
+        f"  Init LSB: {lpb.init_lsb}",
+        f"  Exit LSB: {lpb.exit_lsb}",
+        "  Settings:",
+    ]
     for setting in lpb.system_settings:
-        print("    {}: {}".format(setting["name"], setting["value"]))
+        lines.append(f"    {setting['name']}: {setting['value']}")
+    write_lines(lines)
 
 
+# in the order they are stored in the LPB
 EDITABLE_STRINGS = {
     "project_name": "Project Name",
-    "project_dir": "Project Directory",
     "init_lsb": "Initial LSB (run at startup)",
     "exit_lsb": "Exit LSB (run at exit)",
+    "project_dir": "Project Directory",
 }
 
 
@@ -74,7 +77,8 @@ def edit(lpb_file):
 
     Only specific settings can be edited.
 
-    The original LPB file will be backed up to <lpb_file>.bak
+    The original LPB file will be backed up to <lpb_file>.bak (if any changes
+    were made).
 
     Note: Setting empty fields to improper data types may cause
     undefined behavior in the LiveMaker engine. When editing a field,
@@ -82,39 +86,38 @@ def edit(lpb_file):
     original data type.
 
     """
-    with open(lpb_file, "rb") as f:
-        try:
-            lpb = LMProject.from_file(f)
-        except LiveMakerException as e:
-            sys.exit(f"Could not open LPB file: {e}")
+    data = Path(lpb_file).read_bytes()
+    try:
+        lpb = LMProject.from_lpb(data)
+    except LiveMakerException as e:
+        sys.exit(f"Could not open LPB file: {e}")
 
     print(f"Editing LM project {lpb_file}")
-    for key in lpb.keys():
+    changed = False
+    for key, name in EDITABLE_STRINGS.items():
         orig = getattr(lpb, key)
-        if key in EDITABLE_STRINGS:
-            name = EDITABLE_STRINGS[key]
-            value = click.prompt(name, orig)
-            if value != orig:
-                setattr(lpb, key, value)
-        elif key != "system_settings":
-            print(f"{key} [{orig}]: <skipping uneditable field>")
+        value = click.prompt(name, orig)
+        if value != orig:
+            setattr(lpb, key, value)
+            changed = True
     print("System settings:")
+    param_types = ParamType.__members__
     for setting in lpb.system_settings:
         name = setting["name"]
         orig = setting["value"]
-        param_type = setting["type"]
-        param = Param(value=orig, type=ParamType[param_type])
+        param = Param(value=orig, type=param_types[setting["type"]])
         _edit_parser_op(param, prompt=f"  {name}")
         if param.value != orig:
             setting["value"] = param.value
-        print(lpb.system_settings)
+            changed = True
+
+    if not changed:
+        print("No changes made, LPB was not modified.")
+        return
 
-    print("Backing up original LPB.")
-    shutil.copyfile(str(lpb_file), f"{str(lpb_file)}.bak")
+    backup_file(lpb_file, "LPB", data)
     try:
-        new_lpb_data = lpb.to_lpb()
-        with open(lpb_file, "wb") as f:
-            f.write(new_lpb_data)
-        print("Wrote new LPB.")
+        replace_file(lpb_file, lpb.to_lpb_stream)
     except LiveMakerException as e:
         sys.exit(f"Could not generate new LPB file: {e}")
+    print("Wrote new LPB.")
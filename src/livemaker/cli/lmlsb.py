@@ -18,10 +18,14 @@
 """LiveMaker LSB script CLI tool."""
 
 import csv
+import functools
 import hashlib
+import os
 import re
-import shutil
 import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
 import click
@@ -31,13 +35,13 @@ from lxml import etree
 from livemaker.exceptions import BadLsbError, BadTextIdentifierError, LiveMakerException
 from livemaker.lsb import LMScript
 from livemaker.lsb.command import BaseComponentCommand, Calc, CommandType, Jump, LabelReference
-from livemaker.lsb.core import OpeData, OpeDataType, OpeFuncType, Param, ParamType
+from livemaker.lsb.core import ESCAPE_NEWLINES, OpeData, OpeDataType, OpeFuncType, Param, ParamType, PropertyType
 from livemaker.lsb.menu import LPMSelectionChoice
-from livemaker.lsb.novel import LNSCompiler, LNSDecompiler, TWdChar, TWdOpeReturn
+from livemaker.lsb.novel import LNSCompiler, LNSDecompiler, TWdType
 from livemaker.lsb.translate import TextBlockIdentifier, TextMenuIdentifier, make_identifier
 from livemaker.project import PylmProject
 
-from .cli import __version__, _version
+from .cli import WRITE_BUFSIZE, __version__, _version, backup_file, replace_file, write_lines
 
 
 @click.group()
@@ -56,52 +60,169 @@ def probe(input_file):
     on how a script was originally created, actual char/line counts may vary.
 
     """
-    print(input_file)
     with open(input_file, "rb") as f:
         try:
             lm = LMScript.from_file(f)
         except BadLsbError as e:
+            print(input_file)
             sys.exit(f"Could not read file: {e}")
+    lines = [input_file]
     if lm._parsed_from == "lsc":
-        print("LiveMaker LSC script file:")
+        lines.append("LiveMaker LSC script file:")
     elif lm._parsed_from == "lsc-xml":
-        print("LiveMaker XML LSC script file:")
+        lines.append("LiveMaker XML LSC script file:")
     elif lm._parsed_from == "lsb":
-        print("LiveMaker compiled LSB script file:")
+        lines.append("LiveMaker compiled LSB script file:")
     else:
-        print("LiveMaker script file:")
-    print(f"  Version: {lm.version} (LiveMaker{lm.lm_version})")
-    print(f"  Total commands: {len(lm)}")
-    cmd_types = set()
-    for cmd in lm.commands:
-        cmd_types.add(cmd.type)
-    print("    Command types: {}".format(", ".join([x.name for x in sorted(cmd_types)])))
+        lines.append("LiveMaker script file:")
+    lines.append(f"  Version: {lm.version} (LiveMaker{lm.lm_version})")
+    lines.append(f"  Total commands: {len(lm)}")
+    cmd_types = {cmd.type for cmd in lm.commands}
+    lines.append(f"    Command types: {', '.join(x.name for x in sorted(cmd_types))}")
     scenarios = lm.text_scenarios()
-    print(f"  Total text scenarios: {len(scenarios)}")
+    lines.append(f"  Total text scenarios: {len(scenarios)}")
     for index, name, scenario in scenarios:
         if not name:
             name = "Unlabeled scenario"
-        print(f"    {name}")
-        tpwd_types = set()
-        char_count = 0
-        line_count = 0
-        for wd in scenario.body:
-            tpwd_types.add(wd.type)
-            if isinstance(wd, TWdChar):
-                char_count += 1
-            elif isinstance(wd, TWdOpeReturn):
-                line_count += 1
-        print(f"      LiveNovel scenario version: {scenario.version}")
-        print("      TpWd types: {}".format(", ".join([x.name for x in sorted(tpwd_types)])))
-        print(f"      Approx. character count: {char_count}")
+        lines.append(f"    {name}")
+        tpwd_types = Counter(wd.type for wd in scenario.body)
+        char_count = tpwd_types[TWdType.TWdChar]
+        line_count = tpwd_types[TWdType.TWdOpeReturn]
+        lines.append(f"      LiveNovel scenario version: {scenario.version}")
+        lines.append(f"      TpWd types: {', '.join(x.name for x in sorted(tpwd_types))}")
+        lines.append(f"      Approx. character count: {char_count}")
         if char_count:
             # don't count line breaks in event-only scenarios
-            print(f"      Approx. line count: {line_count}")
+            lines.append(f"      Approx. line count: {line_count}")
+    write_lines(lines)
+
+
+def _map_files(func, paths, *args):
+    """Call ``func(path, *args)`` for each path and yield the results in order.
+
+    Input files are independent of each other, so when there is more than one
+    path they are processed in parallel in a process pool.
+
+    """
+    if len(paths) < 2:
+        for path in paths:
+            yield func(path, *args)
+        return
+    with ProcessPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as executor:
+        yield from executor.map(func, paths, *(repeat(arg) for arg in args))
+
+
+@functools.lru_cache(maxsize=None)
+def _pylm_project(root):
+    # share label caches between files from the same project
+    return PylmProject(root)
+
+
+def _load_pylm(path):
+    """Return (pylm, call_name) for path, or (None, None) if path is not in a LM project."""
+    root = PylmProject.find_root(path)
+    if not root:
+        return None, None
+    pylm = _pylm_project(root)
+    try:
+        return pylm, pylm.call_name(path)
+    except LiveMakerException:
+        return None, None
+
+
+def _sha256(data=b""):
+    # the digests are only used as checksums, which lets restricted (FIPS) OpenSSL
+    # builds use their default implementation (usedforsecurity is new in Python 3.9)
+    try:
+        return hashlib.new("sha256", data, usedforsecurity=False)
+    except TypeError:
+        return hashlib.new("sha256", data)
+
+
+class _RoundTripWriter:
+    """Write-only stream which compares everything written to it against the original file data.
+
+    Args:
+        data (bytes): The original file data.
+        digest (bool): If True, the written data is also hashed with SHA256.
+
+    """
+
+    def __init__(self, data, digest=False):
+        self.data = data
+        self.hash = _sha256() if digest else None
+        self.size = 0
+        self.matches = True
+
+    def write(self, data):
+        if self.matches and not self.data.startswith(data, self.size):
+            self.matches = False
+        if self.hash is not None:
+            self.hash.update(data)
+        self.size += len(data)
+        return len(data)
+
+
+def _validate_one(path, verbose=False):
+    """Validate a single LSB file and return the lines of output."""
+    lines = [path]
+    data = Path(path).read_bytes()
+    try:
+        lsb = LMScript.from_lsb(data)
+    except LiveMakerException as e:
+        lines.append(f"  Failed to parse file: {e}")
+        return lines
+    # compare the reassembled file against the original as it is built, digests
+    # are only needed for verbose output or to report a mismatch
+    try:
+        writer = _RoundTripWriter(data, digest=verbose)
+        lsb.to_lsb_stream(writer)
+        matches = writer.matches and writer.size == len(data)
+        if not matches and not verbose:
+            writer = _RoundTripWriter(data, digest=True)
+            lsb.to_lsb_stream(writer)
+    except LiveMakerException as e:
+        lines.append(f"  Failed to reassemble file: {e}")
+        return lines
+    if verbose or not matches:
+        lines.append(f"  Orig: {_sha256(data).hexdigest()} ({len(data)} bytes)")
+        lines.append(f"   New: {writer.hash.hexdigest()} ({writer.size} bytes)")
+    del data
+    if matches:
+        lines.append("  SHA256 digest validation passed")
+    else:
+        lines.append("  SHA256 digest validation failed")
+    dec = LNSDecompiler()
+    cc = LNSCompiler()
+    # scenario structs only depend on the scenario class, build each one once
+    structs = {}
+    for line, name, scenario in lsb.text_scenarios(run_order=False):
+        lines.append(f"  {name}")
+        cls = type(scenario)
+        if cls not in structs:
+            structs[cls] = cls._struct()
+        struct = structs[cls]
+        try:
+            orig_bytes = struct.build(scenario)
+            script = dec.decompile(scenario)
+            cc.reset()
+            new_body = cc.compile(script)
+            scenario.replace_body(new_body, ruby_text=cc.ruby_text)
+            new_bytes = struct.build(scenario)
+        except LiveMakerException as e:
+            lines.append(f"  script failed: {e}")
+            continue
+        if new_bytes == orig_bytes:
+            lines.append("  script passed")
+        else:
+            lines.append(f"  script mismatch, {len(orig_bytes)} {len(new_bytes)}")
+    return lines
 
 
 @lmlsb.command()
+@click.option("-v", "--verbose", is_flag=True, default=False, help="Always show SHA256 digests.")
 @click.argument("input_file", metavar="file", required=True, nargs=-1, type=click.Path(exists=True))
-def validate(input_file):
+def validate(verbose, input_file):
     """Verify that the specified LSB file(s) can be processed.
 
     Validation is done by disassembling an input file, reassembling it,
@@ -112,42 +233,88 @@ def validate(input_file):
     the scenarios can be decompiled, recompiled, and then reinserted into the
     lsb file.
 
+    Digests are only shown for files which fail validation unless --verbose
+    is specified.
+
+    Multiple files will be validated in parallel.
+
     """
-    for path in input_file:
-        print(path)
+    for lines in _map_files(_validate_one, input_file, verbose):
+        write_lines(lines)
+    sys.stdout.flush()
+
+
+def _dump_one(path, mode, encoding):
+    """Dump a single LSB file.
+
+    Returns:
+        tuple(list, str): The encoded output (as a list of bytes chunks), and an error message if the
+            file could not be dumped.
+
+    """
+    try:
+        pylm, call_name = _load_pylm(path)
         with open(path, "rb") as f:
-            data = f.read()
-        try:
-            lsb = LMScript.from_lsb(data)
-            orig = hashlib.sha256(data).hexdigest()
-        except BadLsbError as e:
-            print(f"  Failed to parse file: {e}")
-            continue
-        try:
-            built_data = lsb.to_lsb()
-            reassembled = hashlib.sha256(built_data).hexdigest()
-        except BadLsbError as e:
-            print(f"  Failed to reassemble file: {e}")
-            continue
-        print(f"  Orig: {orig} ({len(data)} bytes)")
-        print(f"   New: {reassembled} ({len(built_data)} bytes)")
-        if orig == reassembled:
-            print("  SHA256 digest validation passed")
-        if orig != reassembled:
-            print("  SHA256 digest validation failed")
-        for line, name, scenario in lsb.text_scenarios(run_order=False):
-            print(f"  {name}")
-            orig_bytes = scenario._struct().build(scenario)
-            dec = LNSDecompiler()
-            script = dec.decompile(scenario)
-            cc = LNSCompiler()
-            new_body = cc.compile(script)
-            scenario.replace_body(new_body, ruby_text=cc.ruby_text)
-            new_bytes = scenario._struct().build(scenario)
-            if new_bytes == orig_bytes:
-                print("  script passed")
-            else:
-                print(f"  script mismatch, {len(orig_bytes)} {len(new_bytes)}")
+            lsb = LMScript.from_file(f, call_name=call_name, pylm=pylm)
+        if pylm:
+            pylm.update_labels(lsb)
+    except LiveMakerException as e:
+        return [], f"{path}: Failed to parse file: {e}"
+    try:
+        return _dump_lsb(lsb, path, pylm, mode, encoding), None
+    except LiveMakerException as e:
+        return [], f"{path}: Failed to dump file: {e}"
+
+
+def _dump_lsb(lsb, path, pylm, mode, encoding):
+    """Return the encoded dump output for a parsed LSB as a list of bytes chunks.
+
+    Output is written in binary mode, so line endings are converted to the ones
+    text mode output would have used.
+
+    """
+    newline = os.linesep.encode(encoding)
+    if mode == "xml":
+        root = lsb.to_xml()
+        data = etree.tostring(root, encoding=encoding, pretty_print=True, xml_declaration=True)
+        if newline != b"\n":
+            data = data.replace(b"\n", newline)
+        # return the newline separately rather than copying the whole document to append it
+        return [data, newline]
+
+    lines = []
+    if mode == "lines":
+        lsb_path = Path(path)
+        for line, name, scenario in lsb.text_scenarios():
+            if name:
+                name = f"{lsb_path.stem}-{name}.lns"
+            if not name:
+                name = f"{lsb_path.stem}-line{line}.lns"
+            lines.append(name)
+            lines.append("------")
+            for block in scenario.get_text_blocks():
+                lines.extend(block.text.splitlines())
+    else:
+        dec = LNSDecompiler()
+        append = lines.append
+        for c in lsb.commands:
+            mute = ";" if c.Mute else ""
+            label = ""
+            ref = c.get("Page")
+            if ref and isinstance(ref, LabelReference):
+                if ref.Page.endswith("lsb") and pylm:
+                    # resolve lsb refs
+                    line_no, name = pylm.resolve_label(ref)
+                    if line_no is not None:
+                        label = f" (Label {line_no}: {name})"
+            append(f"{mute}{c.LineNo:4}: {'    ' * c.Indent}{str(c).translate(ESCAPE_NEWLINES)}{label}")
+            if c.type == CommandType.TextIns:
+                append(dec.decompile(c.get("Text")))
+    lines.append("")
+    text = "\n".join(lines)
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return [text.encode(encoding)]
 
 
 @lmlsb.command()
@@ -167,7 +334,7 @@ def validate(input_file):
     type=click.Path(dir_okay=False),
     help="Output file. If unspecified, output will be dumped to stdout.",
 )
-@click.argument("input_file", required=True, nargs=-1, type=click.Path(exists=True, dir_okay="False"))
+@click.argument("input_file", required=True, nargs=-1, type=click.Path(exists=True, dir_okay=False))
 def dump(mode, encoding, output_file, input_file):
     """Dump the contents of the specified LSB file(s) to stdout in a human-readable format.
 
@@ -176,71 +343,80 @@ def dump(mode, encoding, output_file, input_file):
     For xml mode, the full LSB file will be output as an XML document.
 
     For lines mode, only text lines will be output.
+
+    Multiple files will be processed in parallel, output is written in the same
+    order as the input files.
     """
     if output_file:
-        outf = open(output_file, mode="w", encoding=encoding)
+        outf = open(output_file, "wb")
     else:
-        outf = sys.stdout
+        sys.stdout.flush()
+        outf = sys.stdout.buffer
+
+    try:
+        for data, error in _map_files(_dump_one, input_file, mode, encoding):
+            if error:
+                sys.stderr.write(f"{error}\n")
+                continue
+            outf.writelines(data)
+    finally:
+        if output_file:
+            outf.close()
+        else:
+            outf.flush()
 
-    pylm = None
-    skip_pylm = False
 
-    for path in input_file:
+def _extract_one(path, encoding, output_dir):
+    """Extract scripts from a single LSB file and return the lines of output."""
+    lines = [f"Extracting scripts from {path}"]
+    stem = Path(path).stem
+    try:
+        lsb = LMScript.from_file(path)
+        scenarios = lsb.text_scenarios()
+    except LiveMakerException as e:
+        lines.append(f"  Failed to parse file: {e}")
+        return lines
+    dec = LNSDecompiler()
+    ref_lines = []
+    for line, name, scenario in scenarios:
+        if name:
+            name = f"{stem}-{_escape_scenario_name(name)}.lns"
+        if not name:
+            name = f"{stem}-line{line}.lns"
+        output_path = output_dir / name
         try:
-            if skip_pylm:
-                call_name = None
-            elif not pylm:
-                try:
-                    pylm = PylmProject(path)
-                    call_name = pylm.call_name(path)
-                except LiveMakerException:
-                    call_name = None
-                    skip_pylm = True
-            with open(path, "rb") as f:
-                lsb = LMScript.from_file(f, call_name=call_name, pylm=pylm)
-            if pylm:
-                pylm.update_labels(lsb)
-        except BadLsbError as e:
-            sys.stderr.write(f"  Failed to parse file: {e}")
+            script = dec.decompile(scenario)
+        except LiveMakerException as e:
+            lines.append(f"  Failed to decompile {name}: {e}")
             continue
+        if os.linesep != "\n":
+            # keep the line endings text mode output would have used
+            script = script.replace("\n", os.linesep)
+        with open(output_path, "wb") as f:
+            f.write(script.encode(encoding))
+        lines.append(f"  wrote {output_path}")
+        ref_lines.append(f"{name}:{line}\n")
+    with open(output_dir / f"{stem}.lsbref", "w", encoding=encoding) as lsb_ref_file:
+        lsb_ref_file.writelines(ref_lines)
+    return lines
+
+
+def _load_lsb(lsb_file):
+    """Parse lsb_file, exiting with an error message on failure."""
+    with open(lsb_file, "rb") as f:
+        try:
+            return LMScript.from_file(f)
+        except LiveMakerException as e:
+            sys.exit(f"Could not open LSB file: {e}")
 
-        if mode == "xml":
-            root = lsb.to_xml()
-            print(
-                etree.tostring(root, encoding=encoding, pretty_print=True, xml_declaration=True).decode(encoding),
-                file=outf,
-            )
-        elif mode == "lines":
-            lsb_path = Path(path)
-            for line, name, scenario in lsb.text_scenarios():
-                if name:
-                    name = f"{lsb_path.stem}-{name}.lns"
-                if not name:
-                    name = f"{lsb_path.stem}-line{line}.lns"
-                print(name, file=outf)
-                print("------", file=outf)
-                for block in scenario.get_text_blocks():
-                    for line in block.text.splitlines():
-                        print(line, file=outf)
-        else:
-            for c in lsb.commands:
-                if c.Mute:
-                    mute = ";"
-                else:
-                    mute = ""
-                s = ["{}{:4}: {}".format(mute, c.LineNo, "    " * c.Indent)]
-                s.append(str(c).replace("\r", "\\r").replace("\n", "\\n"))
-                ref = c.get("Page")
-                if ref and isinstance(ref, LabelReference):
-                    if ref.Page.endswith("lsb") and pylm:
-                        # resolve lsb refs
-                        line_no, name = pylm.resolve_label(ref)
-                        if line_no is not None:
-                            s.append(f" (Label {line_no}: {name})")
-                print("".join(s), file=outf)
-                if c.type == CommandType.TextIns:
-                    dec = LNSDecompiler()
-                    print(dec.decompile(c.get("Text")), file=outf)
+
+def _write_lsb(lsb, lsb_file):
+    """Compile lsb and write it to lsb_file, exiting with an error message on failure."""
+    try:
+        replace_file(lsb_file, lsb.to_lsb_stream)
+    except LiveMakerException as e:
+        sys.exit(f"Could not generate new LSB file: {e}")
+    print("Wrote new LSB.")
 
 
 def _escape_scenario_name(name):
@@ -273,30 +449,17 @@ def extract(encoding, output_dir, input_file):
 
     Output files will be named <LSB name>-<scenario name>.lns
 
+    Multiple input files will be processed in parallel.
+
     """
     if output_dir:
         output_dir = Path(output_dir)
-        if not output_dir.exists():
-            output_dir.mkdir(parents=True)
+        output_dir.mkdir(parents=True, exist_ok=True)
     else:
         output_dir = Path.cwd()
-    for path in input_file:
-        print(f"Extracting scripts from {path}")
-        lsb_path = Path(path)
-        lsb = LMScript.from_file(path)
-        lsb_ref_filename = f"{lsb_path.stem}.lsbref"
-        with open(output_dir.joinpath(lsb_ref_filename), "w", encoding=encoding) as lsb_ref_file:
-            for line, name, scenario in lsb.text_scenarios():
-                if name:
-                    name = f"{lsb_path.stem}-{_escape_scenario_name(name)}.lns"
-                if not name:
-                    name = f"{lsb_path.stem}-line{line}.lns"
-                output_path = output_dir.joinpath(name)
-                dec = LNSDecompiler()
-                with open(output_path, "w", encoding=encoding) as f:
-                    f.write(dec.decompile(scenario))
-                print(f"  wrote {output_path}")
-                lsb_ref_file.write(f"{name}:{line}\n")
+    for lines in _map_files(_extract_one, input_file, encoding, output_dir):
+        write_lines(lines)
+    sys.stdout.flush()
 
 
 @lmlsb.command()
@@ -360,58 +523,52 @@ def batchinsert(encoding, lsb_file, script_dir, no_backup, ignore_missing):
     if not script_dir.exists():
         print("Input directory does not exist")
         return
-    if not no_backup:
-        print("Backing up original LSB.")
-        shutil.copyfile(str(lsb_file), f"{str(lsb_file)}.bak")
-
-    with open(lsb_file, "rb") as f:
-        try:
-            lsb = LMScript.from_file(f)
-        except LiveMakerException as e:
-            sys.exit(f"Could not open LSB file: {e}")
-
-    lsb_path = Path(lsb_file)
-    lsb_ref_filename = f"{lsb_path.stem}.lsbref"
-    with open(script_dir.joinpath(lsb_ref_filename), encoding=encoding) as lsb_ref_file:
-        while True:
-            ln = lsb_ref_file.readline()
-            if ln == "":
-                break
-            lnsplt = ln.split(":")
-            script_file = script_dir.joinpath(lnsplt[0])
-            line_number = int(lnsplt[1])
-
-            if not Path(script_file).exists():
-                if ignore_missing:
-                    print(f"Warning: script file {script_file} is missing, skipped.")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if not no_backup:
+            # the backup is usually a hardlink, but when the LSB has to be copied
+            # the copy can run while the scripts are being compiled
+            backup = executor.submit(backup_file, lsb_file)
+        lsb = _load_lsb(lsb_file)
+
+        lsb_ref_filename = f"{Path(lsb_file).stem}.lsbref"
+        scenarios = {index: (name, scenario) for index, name, scenario in lsb.text_scenarios()}
+        cc = LNSCompiler()
+        with open(script_dir / lsb_ref_filename, encoding=encoding) as lsb_ref_file:
+            for ln in lsb_ref_file:
+                # line number is always the last field
+                name, _, line_number = ln.rstrip("\n").rpartition(":")
+                if not name:
                     continue
-                else:
-                    sys.exit(f"Script file is missing: {script_file}")
+                script_file = script_dir / name
+                line_number = int(line_number)
 
-            with open(script_file, "rb") as f:
-                script = f.read().decode(encoding)
-            try:
-                cc = LNSCompiler()
-                new_body = cc.compile(script)
-            except LiveMakerException as e:
-                sys.exit(f"Could not compile script file: {e}")
-
-            for index, name, scenario in lsb.text_scenarios():
-                if index == line_number:
-                    print(f"Scenario {name} at line {index} will be replaced.")
+                if not script_file.exists():
+                    if ignore_missing:
+                        print(f"Warning: script file {script_file} is missing, skipped.")
+                        continue
+                    else:
+                        sys.exit(f"Script file is missing: {script_file}")
+
+                script = script_file.read_bytes().decode(encoding)
+                try:
+                    cc.reset()
+                    new_body = cc.compile(script)
+                except LiveMakerException as e:
+                    sys.exit(f"Could not compile script file: {e}")
+
+                if line_number in scenarios:
+                    name, scenario = scenarios[line_number]
+                    print(f"Scenario {name} at line {line_number} will be replaced.")
                     scenario.replace_body(new_body, ruby_text=cc.ruby_text)
-                    break
 
-    try:
-        new_lsb_data = lsb.to_lsb()
-        with open(lsb_file, "wb") as f:
-            f.write(new_lsb_data)
-        print("Wrote new LSB.")
-    except LiveMakerException as e:
-        sys.exit(f"Could not generate new LSB file: {e}")
+        if not no_backup:
+            # the backup must be complete before the original is replaced
+            backup.result()
+
+    _write_lsb(lsb, lsb_file)
 
 
-# Known property data types
+# Known property data types, keyed by PropertyType (PR_* code)
 EDITABLE_PROPERTY_TYPES = {
     # PR_NONE = 0x00
     # PR_NAME = 0x01
@@ -426,22 +583,22 @@ EDITABLE_PROPERTY_TYPES = {
     # PR_BORDERWIDTH = 0x0a
     # PR_BORDERCOLOR = 0x0b
     # PR_ALPHA = 0x0c
-    "PR_PRIORITY": ParamType.Int,
+    PropertyType.PR_PRIORITY: ParamType.Int,
     # PR_OFFSETX = 0x0e
     # PR_OFFSETY = 0x0f
     # PR_FONTNAME = 0x10
-    "PR_FONTHEIGHT": ParamType.Int,
+    PropertyType.PR_FONTHEIGHT: ParamType.Int,
     # PR_FONTSTYLE = 0x12
-    "PR_LINESPACE": ParamType.Int,
-    "PR_FONTCOLOR": ParamType.Int,
-    "PR_FONTLINKCOLOR": ParamType.Int,
-    "PR_FONTBORDERCOLOR": ParamType.Int,
-    "PR_FONTHOVERCOLOR": ParamType.Int,
+    PropertyType.PR_LINESPACE: ParamType.Int,
+    PropertyType.PR_FONTCOLOR: ParamType.Int,
+    PropertyType.PR_FONTLINKCOLOR: ParamType.Int,
+    PropertyType.PR_FONTBORDERCOLOR: ParamType.Int,
+    PropertyType.PR_FONTHOVERCOLOR: ParamType.Int,
     # PR_FONTHOVERSTYLE = 0x18
     # PR_HOVERCOLOR = 0x19
-    "PR_ANTIALIAS": ParamType.Flag,
+    PropertyType.PR_ANTIALIAS: ParamType.Flag,
     # PR_DELAY = 0x1b
-    "PR_PAUSED": ParamType.Flag,
+    PropertyType.PR_PAUSED: ParamType.Flag,
     # PR_VOLUME = 0x1d
     # PR_REPEAT = 0x1e
     # PR_BALANCE = 0x1f
@@ -461,7 +618,7 @@ EDITABLE_PROPERTY_TYPES = {
     # PR_INDEX = 0x2d
     # PR_COUNT = 0x2e
     # PR_ONLINK = 0x2f
-    "PR_VISIBLE": ParamType.Flag,
+    PropertyType.PR_VISIBLE: ParamType.Flag,
     # PR_COLCOUNT = 0x31
     # PR_ROWCOUNT = 0x32
     # PR_TEXT = 0x33
@@ -494,8 +651,8 @@ EDITABLE_PROPERTY_TYPES = {
     # PR_ONCLOSED = 0x4e
     # PR_CARETX = 0x4f
     # PR_CARETY = 0x50
-    "PR_IGNOREMOUSE": ParamType.Int,
-    "PR_TEXTPAUSED": ParamType.Flag,
+    PropertyType.PR_IGNOREMOUSE: ParamType.Int,
+    PropertyType.PR_TEXTPAUSED: ParamType.Flag,
     # PR_TEXTDELAY = 0x53
     # PR_HOVERSOURCE = 0x54
     # PR_PRESSEDSOURCE = 0x55
@@ -555,18 +712,18 @@ EDITABLE_PROPERTY_TYPES = {
     # PR_PLAYING = 0x8b
     # PR_REWINDONLOAD = 0x8c
     # PR_COMPOTYPE = 0x8d
-    "PR_FONTSHADOWCOLOR": ParamType.Int,
-    "PR_FONTBORDER": ParamType.Int,
-    "PR_FONTSHADOW": ParamType.Int,
+    PropertyType.PR_FONTSHADOWCOLOR: ParamType.Int,
+    PropertyType.PR_FONTBORDER: ParamType.Int,
+    PropertyType.PR_FONTSHADOW: ParamType.Int,
     # PR_ONKEYDOWN = 0x91
     # PR_ONKEYUP = 0x92
     # PR_ONKEYREPEAT = 0x93
-    "PR_HANDLEKEY": ParamType.Flag,
+    PropertyType.PR_HANDLEKEY: ParamType.Flag,
     # PR_ONFOCUSIN = 0x95
     # PR_ONFOCUSOUT = 0x96
     # PR_OVERLAY = 0x97
     # PR_TAG = 0x98
-    "PR_CAPTURELINK": ParamType.Flag,
+    PropertyType.PR_CAPTURELINK: ParamType.Flag,
     # PR_FONTHOVERBORDER = 0x9a
     # PR_FONTHOVERBORDERCOLOR = 0x9b
     # PR_FONTHOVERSHADOW = 0x9c
@@ -579,7 +736,7 @@ EDITABLE_PROPERTY_TYPES = {
     # PR_REPEATPOS = 0xa3
     # PR_BLURSPAN = 0xa4
     # PR_BLURDELAY = 0xa5
-    "PR_FONTCHANGEABLED": ParamType.Flag,
+    PropertyType.PR_FONTCHANGEABLED: ParamType.Flag,
     # PR_IMEMODE = 0xa7
     # PR_FLOATANGLE = 0xa8
     # PR_FLOATZOOMX = 0xa9
@@ -589,23 +746,24 @@ EDITABLE_PROPERTY_TYPES = {
     # PR_PADDING_RIGHT = 0xad
 }
 
+# EDITABLE_PROPERTY_TYPES keyed by component key (property name)
+_EDITABLE_PROPERTY_NAMES = {prop.name: param_type for prop, param_type in EDITABLE_PROPERTY_TYPES.items()}
+
+
+_STRING_LITERAL_WARNING = (
+    'Warning: String literals should be entered as double quoted (") strings, assuming you meant to enter "{}"'
+)
+
 
 def _check_string_literal(value):
-    if value.startswith('"'):
-        value = value[1:]
-    else:
-        print(
-            'Warning: String literals should be entered as double quoted (") strings, '
-            'assuming you meant to enter "{}"'.format(value)
-        )
-    if value.endswith('"'):
-        value = value[:-1]
-    else:
-        print(
-            'Warning: String literals should be entered as double quoted (") strings, '
-            'assuming you meant to enter "{}"'.format(value)
-        )
-    return value
+    start = 1 if value.startswith('"') else 0
+    end = len(value)
+    if end > start and value.endswith('"'):
+        end -= 1
+    trimmed = value[start:end]
+    if not start or end == len(value):
+        print(_STRING_LITERAL_WARNING.format(trimmed))
+    return trimmed
 
 
 def _edit_parser_op(op, prompt="Operand"):
@@ -655,97 +813,117 @@ def _edit_delimited_string_op(str_op, sep_op, prompt="String"):
     sep_op.value = _check_string_literal(value)
 
 
+def _edit_parser_func(parser, entry, entry_index):
+    """Edit a TLiveParser function entry."""
+    if entry.func == OpeFuncType.AddArray:
+        # Format should be AddArray(<array_variable>, <value>)
+        if len(entry.operands) != 2:
+            print("Skipping complex AddArray entry")
+            return
+        array_var_op = entry.operands[0]
+        if array_var_op.type != ParamType.Var:
+            print(f"AddArray operand 0 is not a variable name: {entry}")
+            return
+        value_entry_index = entry_index.get(entry.operands[1].value)
+        if value_entry_index is None:
+            print(f"AddArray operand 1 does not point to a valid parser ____<arg> entry: {entry}")
+            return
+        value_entry_op = parser.entries[value_entry_index].operands[0]
+        _edit_parser_op(array_var_op, "  Array variable")
+        _edit_parser_op(value_entry_op, "  Array entry")
+    elif entry.func == OpeFuncType.StringToArray:
+        # Format should be StringToArray(<delimited_string>,
+        #   <array_variable>, <separator>)
+        # where array entries are delimited by <separator>.
+        #
+        # i.e. StringToArray("foo,bar", my_array, ",") sets
+        # my_array = ["foo", "bar"]
+        #
+        # NOTE: we allow editing of array entry strings for translation
+        # purposes, but do not allow adding or removing entire entries
+        # since modifying the array length would most likely break LM
+        # core engine scripts.
+        if len(entry.operands) != 3 or (
+            entry.operands[0].type != ParamType.Str
+            or entry.operands[1].type != ParamType.Var
+            or entry.operands[2].type != ParamType.Var
+        ):
+            print("Skipping unexpected StringToArray entry")
+            return
+        sep_entry_index = entry_index.get(entry.operands[2].value)
+        if sep_entry_index is None:
+            print(f"StringToArray operand 2 does not point to a valid parser ____<arg> entry: {entry}")
+            return
+        sep_entry_op = parser.entries[sep_entry_index].operands[0]
+        _edit_parser_op(entry.operands[1], "  Array variable")
+        _edit_delimited_string_op(entry.operands[0], sep_entry_op, "  Array entry")
+    else:
+        print(f"Skipping uneditable parser func type: {entry}")
+
+
+def _edit_parser_to(parser, entry, entry_index):
+    """Edit a TLiveParser assignment entry."""
+    if entry.name.startswith("____"):
+        # ____<arg> entries are edited via the entries which reference them
+        if len(entry.operands) != 1:
+            print("Got unexpected OpeDataType.To entry")
+        return
+    if len(entry.operands) > 1:
+        print("Skipping complex assignment")
+        return
+    value = click.prompt("  Destination variable", entry.name)
+    if value != entry.name:
+        entry.name = value
+    _edit_parser_op(entry.operands[0], "  Value")
+
+
+def _edit_parser_comparison(parser, entry, entry_index):
+    """Edit a TLiveParser boolean comparison entry."""
+    lhs_op = entry.operands[0]
+    if lhs_op.type == ParamType.Var:
+        if lhs_op.value.startswith("____"):
+            index = entry_index.get(lhs_op.value)
+            if index is None:
+                print("Comparison operand 0 does not point to a valid parser ____<arg> entry")
+                return
+            lhs_op = parser.entries[index].operands[0]
+    _edit_parser_op(lhs_op, "  Left hand side")
+    rhs_op = entry.operands[1]
+    if rhs_op.type == ParamType.Var:
+        if rhs_op.value.startswith("____"):
+            index = entry_index.get(rhs_op.value)
+            if index is None:
+                print("Comparison operand 1 does not point to a valid parser ____<arg> entry")
+                return
+            rhs_op = parser.entries[index].operands[0]
+    _edit_parser_op(rhs_op, "  Right hand side")
+
+
+_PARSER_ENTRY_EDITORS = {
+    OpeDataType.To: _edit_parser_to,
+    OpeDataType.Func: _edit_parser_func,
+    OpeDataType.Equal: _edit_parser_comparison,
+    OpeDataType.Big: _edit_parser_comparison,
+    OpeDataType.Small: _edit_parser_comparison,
+    OpeDataType.EBig: _edit_parser_comparison,
+    OpeDataType.ESmall: _edit_parser_comparison,
+    OpeDataType.NEqual: _edit_parser_comparison,
+}
+
+
 def _edit_parser(parser):
     """Edit fields in a TLiveParser."""
-    # map ____<arg> variables to the appropriate entry index for this parser
     print(f"  {parser}")
-    entry_index = {}
-    for i, entry in enumerate(parser.entries):
-        if entry.type == OpeDataType.To and entry.name.startswith("____"):
-            if len(entry.operands) != 1:
-                print("Got unexpected OpeDataType.To entry")
-                continue
-            entry_index[entry.name] = i
-        elif entry.type == OpeDataType.Func:
-            if entry.func == OpeFuncType.AddArray:
-                # Format should be AddArray(<array_variable>, <value>)
-                if len(entry.operands) != 2:
-                    print("Skipping complex AddArray entry")
-                    continue
-                array_var_op = entry.operands[0]
-                if array_var_op.type != ParamType.Var:
-                    print(f"AddArray operand 0 is not a variable name: {entry}")
-                    continue
-                value_entry_index = entry_index.get(entry.operands[1].value)
-                if value_entry_index is None:
-                    print(f"AddArray operand 1 does not point to a valid parser ____<arg> entry: {entry}")
-                    continue
-                value_entry_op = parser.entries[value_entry_index].operands[0]
-                _edit_parser_op(array_var_op, "  Array variable")
-                _edit_parser_op(value_entry_op, "  Array entry")
-            elif entry.func == OpeFuncType.StringToArray:
-                # Format should be StringToArray(<delimited_string>,
-                #   <array_variable>, <separator>)
-                # where array entries are delimited by <separator>.
-                #
-                # i.e. StringToArray("foo,bar", my_array, ",") sets
-                # my_array = ["foo", "bar"]
-                #
-                # NOTE: we allow editing of array entry strings for translation
-                # purposes, but do not allow adding or removing entire entries
-                # since modifying the array length would most likely break LM
-                # core engine scripts.
-                if len(entry.operands) != 3 or (
-                    entry.operands[0].type != ParamType.Str
-                    or entry.operands[1].type != ParamType.Var
-                    or entry.operands[2].type != ParamType.Var
-                ):
-                    print("Skipping unexpected StringToArray entry")
-                    continue
-                sep_entry_index = entry_index.get(entry.operands[2].value)
-                if sep_entry_index is None:
-                    print(f"StringToArray operand 2 does not point to a valid parser ____<arg> entry: {entry}")
-                    continue
-                sep_entry_op = parser.entries[sep_entry_index].operands[0]
-                _edit_parser_op(entry.operands[1], "  Array variable")
-                _edit_delimited_string_op(entry.operands[0], sep_entry_op, "  Array entry")
-            else:
-                print(f"Skipping uneditable parser func type: {entry}")
-        elif entry.type == OpeDataType.To:
-            if len(entry.operands) > 1:
-                print("Skipping complex assignment")
-                continue
-            value = click.prompt("  Destination variable", entry.name)
-            if value != entry.name:
-                entry.name = value
-            _edit_parser_op(entry.operands[0], "  Value")
-        elif entry.type in (
-            OpeDataType.Equal,
-            OpeDataType.Big,
-            OpeDataType.Small,
-            OpeDataType.EBig,
-            OpeDataType.ESmall,
-            OpeDataType.NEqual,
-        ):
-            # boolean comparison
-            lhs_op = entry.operands[0]
-            if lhs_op.type == ParamType.Var:
-                if lhs_op.value.startswith("____"):
-                    index = entry_index.get(lhs_op.value)
-                    if index is None:
-                        print("Comparison operand 0 does not point to a valid parser ____<arg> entry")
-                        continue
-                    lhs_op = parser.entries[index].operands[0]
-            _edit_parser_op(lhs_op, "  Left hand side")
-            rhs_op = entry.operands[1]
-            if rhs_op.type == ParamType.Var:
-                if rhs_op.value.startswith("____"):
-                    index = entry_index.get(rhs_op.value)
-                    if index is None:
-                        print("Comparison operand 1 does not point to a valid parser ____<arg> entry")
-                        continue
-                    rhs_op = parser.entries[index].operands[0]
-            _edit_parser_op(rhs_op, "  Right hand side")
+    # map ____<arg> variables to the appropriate entry index for this parser
+    entry_index = {
+        entry.name: i
+        for i, entry in enumerate(parser.entries)
+        if entry.type == OpeDataType.To and entry.name.startswith("____") and len(entry.operands) == 1
+    }
+    for entry in parser.entries:
+        edit = _PARSER_ENTRY_EDITORS.get(entry.type)
+        if edit:
+            edit(parser, entry, entry_index)
         else:
             print(f"Skipping uneditable parser entry: {entry}")
 
@@ -772,13 +950,14 @@ def _edit_component(cmd):
     print("Enter new value for each field (or keep existing value)")
     for key in cmd._component_keys:
         parser = cmd[key]
+        param_type = _EDITABLE_PROPERTY_NAMES.get(key)
         # TODO: editing complex fields and adding values for empty fields will
         # require full LiveParser expression parsing, for now we can only edit
         # simple scalar values.
         if (
             len(parser.entries) > 1
             or (len(parser.entries) == 1 and parser.entries[0].type != OpeDataType.To)
-            or (len(parser.entries) == 0 and key not in EDITABLE_PROPERTY_TYPES)
+            or (len(parser.entries) == 0 and param_type is None)
         ):
             print(f"{key} [{parser}]: <skipping uneditable field>")
             continue
@@ -797,7 +976,6 @@ def _edit_component(cmd):
         else:
             value = click.prompt(key, default="")
             if value:
-                param_type = EDITABLE_PROPERTY_TYPES[key]
                 try:
                     if param_type == ParamType.Int or param_type == ParamType.Flag:
                         value = int(value)
@@ -850,21 +1028,14 @@ def edit(lsb_file, line_number):
     original data type.
 
     """
-    with open(lsb_file, "rb") as f:
-        try:
-            lsb = LMScript.from_file(f)
-        except LiveMakerException as e:
-            sys.exit(f"Could not open LSB file: {e}")
+    lsb = _load_lsb(lsb_file)
 
-    cmd = None
-    for c in lsb.commands:
-        if c.LineNo == line_number:
-            cmd = c
-            break
-    else:
+    try:
+        _, cmd = lsb.get_command(line_number)
+    except KeyError:
         sys.exit(f"Command {line_number} does not exist in the specified LSB")
 
-    print("{}: {}".format(line_number, str(cmd).replace("\r", "\\r").replace("\n", "\\n")))
+    print("{}: {}".format(line_number, str(cmd).translate(ESCAPE_NEWLINES)))
     if isinstance(cmd, BaseComponentCommand):
         _edit_component(cmd)
     elif isinstance(cmd, Calc):
@@ -874,15 +1045,8 @@ def edit(lsb_file, line_number):
     else:
         sys.exit(f"Cannot edit {cmd.type.name} commands.")
 
-    print("Backing up original LSB.")
-    shutil.copyfile(str(lsb_file), f"{str(lsb_file)}.bak")
-    try:
-        new_lsb_data = lsb.to_lsb()
-        with open(lsb_file, "wb") as f:
-            f.write(new_lsb_data)
-        print("Wrote new LSB.")
-    except LiveMakerException as e:
-        sys.exit(f"Could not generate new LSB file: {e}")
+    backup_file(lsb_file)
+    _write_lsb(lsb, lsb_file)
 
 
 def insert_lns(encoding, lsb_file, script_file, line_number, no_backup):
@@ -898,47 +1062,35 @@ def insert_lns(encoding, lsb_file, script_file, line_number, no_backup):
     --no-backup option is specified.
 
     """
-    # TODO: modify the function so that it doesn't write new file for each script during batch insert
-    with open(script_file, "rb") as f:
-        script = f.read().decode(encoding)
+    script = Path(script_file).read_bytes().decode(encoding)
     try:
         cc = LNSCompiler()
         new_body = cc.compile(script)
     except LiveMakerException as e:
         sys.exit(f"Could not compile script file: {e}")
 
-    with open(lsb_file, "rb") as f:
-        try:
-            lsb = LMScript.from_file(f)
-        except LiveMakerException as e:
-            sys.exit(f"Could not open LSB file: {e}")
+    lsb = _load_lsb(lsb_file)
 
-    for index, name, scenario in lsb.text_scenarios():
-        if index == line_number:
-            print(f"Scenario {name} at line {index} will be replaced.")
-            scenario.replace_body(new_body, ruby_text=cc.ruby_text)
-            break
-    else:
+    scenarios = {index: (name, scenario) for index, name, scenario in lsb.text_scenarios()}
+    if line_number not in scenarios:
         sys.exit("No matching TextIns command in the specified LSB.")
+    name, scenario = scenarios[line_number]
+    print(f"Scenario {name} at line {line_number} will be replaced.")
+    scenario.replace_body(new_body, ruby_text=cc.ruby_text)
 
     if not no_backup:
-        print("Backing up original LSB.")
-        shutil.copyfile(str(lsb_file), f"{str(lsb_file)}.bak")
-    try:
-        new_lsb_data = lsb.to_lsb()
-        with open(lsb_file, "wb") as f:
-            f.write(new_lsb_data)
-        print("Wrote new LSB.")
-    except LiveMakerException as e:
-        sys.exit(f"Could not generate new LSB file: {e}")
+        backup_file(lsb_file)
+    _write_lsb(lsb, lsb_file)
 
 
 CSV_HEADER = ["ID", "Label", "Context", "Original text", "Translated text"]
+CSV_DIALECT = "pylivemaker"
+csv.register_dialect(CSV_DIALECT, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
 
 
 @lmlsb.command()
-@click.argument("lsb_file", required=True, type=click.Path(exists=True, dir_okay="False"))
-@click.argument("csv_file", required=True, type=click.Path(exists=False, dir_okay="False"))
+@click.argument("lsb_file", required=True, type=click.Path(exists=True, dir_okay=False))
+@click.argument("csv_file", required=True, type=click.Path(exists=False, dir_okay=False))
 @click.option(
     "-e",
     "--encoding",
@@ -1012,19 +1164,18 @@ def extractmenu(lsb_file, csv_file, encoding, lpm, overwrite, append):
         print(f"File {csv_file} does not exist, but --append specified. A new file will be created.")
         append = False
 
-    with open(csv_file, ("a" if append else "w"), encoding=encoding, newline="\n") as csvfile:
-        csv_writer = csv.writer(csvfile, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+    with open(csv_file, ("a" if append else "w"), encoding=encoding, newline="\n", buffering=WRITE_BUFSIZE) as csvfile:
+        csv_writer = csv.writer(csvfile, dialect=CSV_DIALECT)
         if not append:
             csv_writer.writerow(CSV_HEADER)
-        for row in csv_data:
-            csv_writer.writerow(row)
+        csv_writer.writerows(csv_data)
 
     print(f"{len(csv_data)} Menu entries extracted.")
 
 
 @lmlsb.command()
-@click.argument("lsb_file", required=True, type=click.Path(exists=True, dir_okay="False"))
-@click.argument("csv_file", required=True, type=click.Path(exists=False, dir_okay="False"))
+@click.argument("lsb_file", required=True, type=click.Path(exists=True, dir_okay=False))
+@click.argument("csv_file", required=True, type=click.Path(exists=False, dir_okay=False))
 @click.option(
     "-e",
     "--encoding",
@@ -1063,7 +1214,7 @@ def insertmenu(lsb_file, csv_file, encoding, no_backup, verbose):
     csv_data = []
 
     with open(csv_file, newline="\n", encoding=encoding) as csvfile:
-        csv_reader = csv.reader(csvfile, delimiter=",", quotechar='"')
+        csv_reader = csv.reader(csvfile, dialect=CSV_DIALECT)
         for row in csv_reader:
             csv_data.append(row)
 
@@ -1076,15 +1227,8 @@ def insertmenu(lsb_file, csv_file, encoding, no_backup, verbose):
         return
 
     if not no_backup:
-        print("Backing up original LSB.")
-        shutil.copyfile(str(lsb_file), f"{str(lsb_file)}.bak")
-    try:
-        new_lsb_data = lsb.to_lsb()
-        with open(lsb_file, "wb") as f:
-            f.write(new_lsb_data)
-        print("Wrote new LSB.")
-    except LiveMakerException as e:
-        sys.exit(f"Could not generate new LSB file: {e}")
+        backup_file(lsb_file)
+    _write_lsb(lsb, lsb_file)
 
 
 def _patch_csv_menus(lsb, lsb_file, csv_data, verbose=False):
@@ -1120,8 +1264,8 @@ def _patch_csv_menus(lsb, lsb_file, csv_data, verbose=False):
 
 
 @lmlsb.command()
-@click.argument("lsb_file", required=True, type=click.Path(exists=True, dir_okay="False"))
-@click.argument("csv_file", required=True, type=click.Path(exists=False, dir_okay="False"))
+@click.argument("lsb_file", required=True, type=click.Path(exists=True, dir_okay=False))
+@click.argument("csv_file", required=True, type=click.Path(exists=False, dir_okay=False))
 @click.option(
     "-e",
     "--encoding",
@@ -1177,12 +1321,11 @@ def extractcsv(lsb_file, csv_file, encoding, overwrite, append):
         print(f"File {csv_file} does not exist, but --append specified. A new file will be created.")
         append = False
 
-    with open(csv_file, ("a" if append else "w"), newline="\n", encoding=encoding) as csvfile:
-        csv_writer = csv.writer(csvfile, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+    with open(csv_file, ("a" if append else "w"), newline="\n", encoding=encoding, buffering=WRITE_BUFSIZE) as csvfile:
+        csv_writer = csv.writer(csvfile, dialect=CSV_DIALECT)
         if not append:
             csv_writer.writerow(CSV_HEADER)
-        for row in csv_data:
-            csv_writer.writerow(row)
+        csv_writer.writerows(csv_data)
 
     print(f"Extracted {len(csv_data)} text blocks.")
 
@@ -1220,8 +1363,8 @@ def _patch_csv_text(lsb, lsb_file, csv_data, verbose=False):
 
 
 @lmlsb.command()
-@click.argument("lsb_file", required=True, type=click.Path(exists=True, dir_okay="False"))
-@click.argument("csv_file", required=True, type=click.Path(exists=False, dir_okay="False"))
+@click.argument("lsb_file", required=True, type=click.Path(exists=True, dir_okay=False))
+@click.argument("csv_file", required=True, type=click.Path(exists=False, dir_okay=False))
 @click.option(
     "-e",
     "--encoding",
@@ -1258,7 +1401,7 @@ def insertcsv(lsb_file, csv_file, encoding, no_backup, verbose):
     csv_data = []
 
     with open(csv_file, newline="\n", encoding=encoding) as csvfile:
-        csv_reader = csv.reader(csvfile, delimiter=",", quotechar='"')
+        csv_reader = csv.reader(csvfile, dialect=CSV_DIALECT)
         for row in csv_reader:
             csv_data.append(row)
 
@@ -1270,12 +1413,5 @@ def insertcsv(lsb_file, csv_file, encoding, no_backup, verbose):
         return
 
     if not no_backup:
-        print("Backing up original LSB.")
-        shutil.copyfile(str(lsb_file), f"{str(lsb_file)}.bak")
-    try:
-        new_lsb_data = lsb.to_lsb()
-        with open(lsb_file, "wb") as f:
-            f.write(new_lsb_data)
-        print("Wrote new LSB.")
-    except LiveMakerException as e:
-        sys.exit(f"Could not generate new LSB file: {e}")
+        backup_file(lsb_file)
+    _write_lsb(lsb, lsb_file)
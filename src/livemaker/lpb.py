@@ -18,6 +18,7 @@
 """LiveMaker project settings file (LPB) module."""
 
 from io import IOBase
+from pathlib import Path
 
 import construct
 import numpy
@@ -200,15 +201,49 @@ class LMProject:
 
         """
         if not isinstance(infile, IOBase):
-            infile = open(infile, "rb")
+            return cls.from_lpb(Path(infile).read_bytes())
         try:
             return cls.from_struct(cls._struct().parse_stream(infile))
         except construct.ConstructError as e:
             raise BadLpbError(e)
 
+    @classmethod
+    def from_lpb(cls, data):
+        """Parse the specified .lpb data into an LMProject.
+
+        Parsing from a buffer avoids the many small reads construct makes
+        when parsing from a file.
+
+        Args:
+            data: Input .lpb data.
+
+        Raises:
+            BadLpbError: If the input data could not be parsed.
+
+        """
+        try:
+            return cls.from_struct(cls._struct().parse(data))
+        except construct.ConstructError as e:
+            raise BadLpbError(e)
+
     def to_lpb(self):
         """Compile settings into binary .lpb format."""
         try:
             return self._struct().build(self)
         except construct.ConstructError as e:
             raise BadLpbError(e)
+
+    def to_lpb_stream(self, stream):
+        """Compile settings into binary .lpb format and write them to `stream`.
+
+        Unlike :meth:`to_lpb`, the compiled settings are not held in memory in
+        their entirety.
+
+        Args:
+            stream: Writable (and seekable) binary file-like object.
+
+        """
+        try:
+            self._struct().build_stream(self, stream)
+        except construct.ConstructError as e:
+            raise BadLpbError(e)
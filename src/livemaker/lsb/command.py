@@ -328,17 +328,26 @@ class BaseCommand(BaseSerializable):
     #         cmd._parse_lsc_args(*args[5:], **kwargs)
     #     return cmd
 
-    def to_xml(self):
-        """Return an XML representation of this command."""
-        root = etree.Element(
-            "Item",
-            Command=self.type.name,
-            LineNo=str(self.LineNo),
-            Indent=str(self.Indent),
-            Mute=str(int(self.Mute)),
-            NotUpdate=str(int(self.NotUpdate)),
-            Color=str(self.Color),
-        )
+    def to_xml(self, parent=None):
+        """Return an XML representation of this command.
+
+        Args:
+            parent (etree.Element): If set, the command element is created as a
+                child of `parent` rather than as a new (detached) element.
+
+        """
+        attrib = {
+            "Command": self.type.name,
+            "LineNo": str(self.LineNo),
+            "Indent": str(self.Indent),
+            "Mute": str(int(self.Mute)),
+            "NotUpdate": str(int(self.NotUpdate)),
+            "Color": str(self.Color),
+        }
+        if parent is None:
+            root = etree.Element("Item", attrib)
+        else:
+            root = etree.SubElement(parent, "Item", attrib)
         for k, v in self.args.items():
             item = etree.SubElement(root, k)
             if hasattr(v, "to_xml"):
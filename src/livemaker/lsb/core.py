@@ -25,6 +25,9 @@ import numpy
 from loguru import logger
 from lxml import etree
 
+# str.translate() table for escaping line breaks in single line output
+ESCAPE_NEWLINES = str.maketrans({"\r": "\\r", "\n": "\\n"})
+
 
 class BaseSerializable(ABC):
     """Base class for serializable LiveMaker objects.
@@ -844,7 +847,7 @@ class LiveParser(BaseSerializable):
                             else:
                                 operands[i] = op.value
                         elif op.type == ParamType.Str:
-                            operands[i] = f'"{op.value}"'.replace("\n", "\\n").replace("\r", "\\r")
+                            operands[i] = f'"{op.value}"'.translate(ESCAPE_NEWLINES)
                         else:
                             operands[i] = op.value
 
@@ -24,6 +24,7 @@ from loguru import logger
 
 from ..exceptions import LiveMakerException
 from .command import CommandType
+from .core import ESCAPE_NEWLINES
 
 END_COMMANDS = [
     CommandType.Exit,
@@ -199,7 +200,7 @@ def nx_to_dot(graph):
         lines = []
         for node in block_nodes:
             cmd = graph.nodes[node]["cmd"]
-            s = str(cmd).replace("\r", "\\r").replace("\n", "\\n")
+            s = str(cmd).translate(ESCAPE_NEWLINES)
             lines.append(f"{cmd.LineNo:4}: {s}\\l")
             if cmd.type == CommandType.TextIns:
                 blocks = cmd["Text"].get_text_blocks()
@@ -172,6 +172,8 @@ class LMScript(BaseSerializable):
         else:
             self._commands = commands
         self._cmd_index = {cmd.LineNo: i for i, cmd in enumerate(self._commands)}
+        # {run_order: scenarios}, see text_scenarios()
+        self._text_scenarios = {}
 
     def keys(self):
         return ["version", "flags", "command_count", "param_stream_size", "command_params", "commands"]
@@ -291,6 +293,21 @@ class LMScript(BaseSerializable):
         except construct.ConstructError as e:
             raise BadLsbError(e)
 
+    def to_lsb_stream(self, stream):
+        """Compile this script into binary .lsb format and write it to `stream`.
+
+        Unlike :meth:`to_lsb`, the compiled script is not held in memory in
+        its entirety.
+
+        Args:
+            stream: Writable (and seekable) binary file-like object.
+
+        """
+        try:
+            self._struct().build_stream(self, stream)
+        except construct.ConstructError as e:
+            raise BadLsbError(e)
+
     def to_xml(self):
         """Return this script as an .lsc format XML etree.Element."""
         root = etree.Element("Page")
@@ -311,7 +328,8 @@ class LMScript(BaseSerializable):
                     item.text = "1"
         command = etree.SubElement(root, "Command")
         for c in self.commands:
-            command.append(c.to_xml())
+            # build commands in place instead of appending detached elements
+            c.to_xml(command)
         return root
 
     @classmethod
@@ -487,7 +505,16 @@ class LMScript(BaseSerializable):
         Returns:
             tuple(int, str, :class:`TpWord`): (line_num, name, scenario)
 
+        Note:
+            The scenario list is only built once for each value of `run_order`.
+            Assigning a new list to `commands` discards the cached results.
+
         """
+        if run_order not in self._text_scenarios:
+            self._text_scenarios[run_order] = self._find_text_scenarios(run_order)
+        return list(self._text_scenarios[run_order])
+
+    def _find_text_scenarios(self, run_order):
         if run_order:
             gen = self.walk(unreachable=True)
         else:
@@ -28,7 +28,7 @@ from loguru import logger
 from lxml import etree
 
 from ..exceptions import BadLnsError, InvalidCharError
-from .core import BaseSerializable, LiveParser
+from .core import ESCAPE_NEWLINES, BaseSerializable, LiveParser
 from .translate import BaseTranslatable
 
 
@@ -174,11 +174,11 @@ class BaseTWdGlyph(BaseSerializable):
             + cls._struct_fields
         )
 
+    _LNS_ESCAPE_TABLE = str.maketrans({c: f"\\{c}" for c in '\\<>{}"'})
+
     @classmethod
     def lns_escape(self, s):
-        for i, j in [("\\", "\\\\"), ("<", "\\<"), (">", "\\>"), ("{", "\\{"), ("}", "\\}"), ('"', '\\"')]:
-            s = s.replace(i, j)
-        return s
+        return s.translate(self._LNS_ESCAPE_TABLE)
 
 
 class BaseTWdReal(BaseTWdGlyph):
@@ -243,10 +243,12 @@ class TWdChar(BaseTWdReal):
 
     def __init__(self, ch="", decorator=0, **kwargs):
         super().__init__(**kwargs)
-        try:
-            ch.encode("cp932")
-        except UnicodeEncodeError:
-            raise InvalidCharError(ch)
+        if not ch.isascii():
+            # ASCII is always representable in cp932
+            try:
+                ch.encode("cp932")
+            except UnicodeEncodeError:
+                raise InvalidCharError(ch)
         self._keys.update(("ch", "decorator"))
         self.ch = ch
         self.decorator = decorator
@@ -703,7 +705,7 @@ class TWdLink(BaseSerializable):
 
     def __str__(self):
         s = "TWdLink({})".format(", ".join([f"{k}={v}" for k, v in self.items()]))
-        return s.replace("\r", "\\r").replace("\n", "\\n")
+        return s.translate(ESCAPE_NEWLINES)
 
     def __iter__(self):
         return iter(self.items())
@@ -810,8 +812,8 @@ class TpWord(BaseSerializable):
     def _struct(cls):
         # Note: LiveMaker's parser silently ignores invalid TWdType's,
         # so use Byte as the last Select() option to do the same thing
-        select_subcons = _twd_structs
-        select_subcons.append(construct.Byte)
+        # (don't append to _twd_structs itself, it would grow on every call)
+        select_subcons = _twd_structs + [construct.Byte]
         return construct.Struct(
             "signature" / construct.Const(b"TpWord"),
             "version" / _TpWordVersionAdapter(construct.Bytes(3)),
@@ -2,9 +2,15 @@
 
 """Tests for `pylivemaker` package."""
 
+import zlib
+from io import BytesIO
+
+import pytest
 from click.testing import CliRunner
 
 from livemaker import cli
+from livemaker.archive import LMArchive, LMCompressType
+from livemaker.exceptions import UnsupportedLiveMakerCompression
 
 
 def test_lmar(shared_datadir):
@@ -57,6 +63,32 @@ def test_validate(shared_datadir):
     result = runner.invoke(cli.lmlsb, ["validate", str(shared_datadir / "00000001.lsb")])
     assert result.exit_code == 0
 
+    # multiple files are validated in parallel, but output should stay in order
+    paths = [str(shared_datadir / "gamemain.lsb"), str(shared_datadir / "00000001.lsb")]
+    result = runner.invoke(cli.lmlsb, ["validate"] + paths)
+    assert result.exit_code == 0
+    assert result.output.count("SHA256 digest validation passed") == 2
+    assert "Orig:" not in result.output
+    assert result.output.index(paths[0]) < result.output.index(paths[1])
+
+    result = runner.invoke(cli.lmlsb, ["validate", "-v", str(shared_datadir / "00000001.lsb")])
+    assert result.exit_code == 0
+    assert "Orig:" in result.output
+
+
+def test_extract_bad_file(shared_datadir, tmp_path):
+    """Test that one unreadable file does not abort extracting a batch of LSBs."""
+    bad = tmp_path / "bad.lsb"
+    bad.write_bytes(b"not an lsb")
+    out = tmp_path / "out"
+    out.mkdir()
+    runner = CliRunner()
+
+    result = runner.invoke(cli.lmlsb, ["extract", "-o", str(out), str(bad), str(shared_datadir / "00000001.lsb")])
+    assert result.exit_code == 0
+    assert "Failed to parse file" in result.output
+    assert (out / "00000001.lsbref").exists()
+
 
 def test_extractcsv(shared_datadir, tmp_path):
     """Test lmlsb extractcsv."""
@@ -99,3 +131,68 @@ pylm:text:00000001.lsb:8:1,00000003,,Wait for click,
     assert result.exit_code == 0
     assert "Translated 1 lines" in result.output
     assert "Ignored 1 untranslated lines" in result.output
+
+
+def test_archive_writebytes(shared_datadir, tmp_path):
+    """Test copying entries between archives with LMArchive.writebytes."""
+    out = tmp_path / "copy.dat"
+    with LMArchive(shared_datadir / "test.dat") as orig:
+        with LMArchive(out, mode="w", version=orig.version) as new:
+            for info in orig.infolist():
+                data = orig.read(info, decompress=False)
+                chunks = [data[i : i + 4] for i in range(0, len(data), 4)]
+                new.writebytes(info, iter(chunks), compressed_size=info.compressed_size)
+        expected = {info.name: orig.read(info) for info in orig.infolist()}
+
+    with LMArchive(out) as lm:
+        assert {info.name: lm.read(info, skip_checksum=False) for info in lm.infolist()} == expected
+
+
+def test_archive_write_exe(shared_datadir, tmp_path):
+    """Test writing an executable archive."""
+    exe = shared_datadir / "test.exe"
+    out = tmp_path / "out.exe"
+    with LMArchive(shared_datadir / "test.dat") as orig:
+        with LMArchive(out, mode="w", exe=exe, version=orig.version) as new:
+            for info in orig.infolist():
+                new.writebytes(info, orig.read(info, decompress=False))
+
+    with LMArchive(out) as lm:
+        assert lm.is_exe
+        assert lm.read_exe() == exe.read_bytes()
+        buf = BytesIO()
+        lm.read_exe_into(buf)
+        assert buf.getvalue() == exe.read_bytes()
+        assert "hello.txt" in lm.namelist()
+
+
+def test_archive_open_truncated(tmp_path):
+    """Test that streaming a truncated zlib entry raises an error instead of returning short data."""
+    out = tmp_path / "truncated.dat"
+    data = zlib.compress(bytes(range(256)) * 64)
+    with LMArchive(out, mode="w") as new:
+        new.writebytes("data.bin", data[:-8], compress_type=LMCompressType.ZLIB)
+
+    with LMArchive(out) as lm:
+        with pytest.raises(UnsupportedLiveMakerCompression):
+            lm.open("data.bin").read()
+        with pytest.raises(UnsupportedLiveMakerCompression):
+            lm.extract("data.bin", tmp_path / "out")
+    assert not (tmp_path / "out" / "data.bin").exists()
+
+
+def test_archive_write_bad_version():
+    """Test that unsupported write versions are rejected when the archive is opened."""
+    fp = BytesIO()
+    with pytest.raises(ValueError, match="Unsupported LiveMaker archive version"):
+        LMArchive("out.dat", mode="w", fp=fp, version=99)
+    assert not fp.closed
+
+
+def test_lmar_extract(shared_datadir, tmp_path):
+    """Test lmar x."""
+    runner = CliRunner()
+
+    result = runner.invoke(cli.lmar, ["x", "-o", str(tmp_path), str(shared_datadir / "test.dat")])
+    assert result.exit_code == 0
+    assert (tmp_path / "hello.txt").read_bytes() == b"Hello world!\n"